@@ -1,18 +1,41 @@
-from fastapi import HTTPException
+from fastapi import HTTPException, Security
+from fastapi.security.api_key import APIKeyHeader
 import hmac
 import json
+import os
 from pathlib import Path
 
+CONFIG_PATH = Path("/etc/stig-central/config.json")
+
+API_KEY_HEADER = APIKeyHeader(name="X-API-Key")
+
+# Parsed API keys, keyed on the config file's mtime
+_CONFIG_CACHE = {"mtime": 0, "keys": frozenset()}
+
+def load_api_keys(config_path: Path = CONFIG_PATH) -> frozenset:
+    """Load the configured API keys as bytes, re-reading only when the config changes"""
+    mtime = os.stat(config_path).st_mtime_ns
+    if mtime != _CONFIG_CACHE["mtime"]:
+        with open(config_path) as f:
+            config = json.load(f)
+
+        _CONFIG_CACHE["keys"] = frozenset(key.encode() for key in config.get("api_keys", {}))
+        _CONFIG_CACHE["mtime"] = mtime
+
+    return _CONFIG_CACHE["keys"]
+
 async def verify_api_key(api_key: str) -> bool:
     """Verify API key from agent"""
     try:
-        config_path = Path("/etc/stig-central/config.json")
-        with open(config_path) as f:
-            config = json.load(f)
-            
-        valid_keys = config.get("api_keys", {})
+        valid_keys = load_api_keys()
         
-        if api_key not in valid_keys:
+        # Compare against every configured key so timing does not reveal a match
+        key_bytes = api_key.encode()
+        matched = False
+        for stored in valid_keys:
+            matched |= hmac.compare_digest(key_bytes, stored)
+
+        if not matched:
             raise HTTPException(
                 status_code=403,
                 detail="Invalid API key"
@@ -20,8 +43,15 @@ async def verify_api_key(api_key: str) -> bool:
             
         return True
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error verifying API key: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+async def require_api_key(api_key: str = Security(API_KEY_HEADER)) -> str:
+    """FastAPI dependency that returns the validated API key"""
+    await verify_api_key(api_key)
+    return api_key 
\ No newline at end of file
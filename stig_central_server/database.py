@@ -1,23 +1,68 @@
+import asyncio
+import sqlite3
 import aiosqlite
-import json
+import orjson
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Dict, List, Any
 import logging
 from pathlib import Path
 
+# Applied to every connection; journal_mode=WAL persists in the database file
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
 class DatabaseManager:
     """Database manager for the central server"""
     
     def __init__(self, db_path: str = "/var/lib/stig-central/central.db"):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
+        self._db = None
+        self._write_lock = None
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         self._init_database()
 
+    async def connect(self) -> None:
+        """Open the shared database connection"""
+        if self._db is None:
+            self._db = await aiosqlite.connect(self.db_path)
+            for pragma in PRAGMAS:
+                await self._db.execute(pragma)
+            # SQLite allows a single writer; serialize writes on the shared connection
+            self._write_lock = asyncio.Lock()
+
+    async def close(self) -> None:
+        """Close the shared database connection"""
+        if self._db is not None:
+            await self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            await self._db.close()
+            self._db = None
+
+    @asynccontextmanager
+    async def _writer(self):
+        """Yield the shared connection with exclusive write access"""
+        async with self._write_lock:
+            try:
+                yield self._db
+            except BaseException:
+                # Leave no open transaction behind on the shared connection
+                await self._db.rollback()
+                raise
+
     def _init_database(self):
         """Initialize the database schema"""
-        with aiosqlite.connect(self.db_path) as db:
-            db.execute("""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            for pragma in PRAGMAS:
+                cursor.execute(pragma)
+
+            cursor.execute("""
                 CREATE TABLE IF NOT EXISTS hosts (
                     host_id TEXT PRIMARY KEY,
                     hostname TEXT NOT NULL,
@@ -26,7 +71,7 @@ class DatabaseManager:
                 )
             """)
 
-            db.execute("""
+            cursor.execute("""
                 CREATE TABLE IF NOT EXISTS scan_results (
                     result_id TEXT PRIMARY KEY,
                     host_id TEXT NOT NULL,
@@ -36,7 +81,30 @@ class DatabaseManager:
                 )
             """)
 
-            db.execute("""
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS findings (
+                    result_id TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    rule_id TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    fix TEXT,
+                    FOREIGN KEY (result_id) REFERENCES scan_results (result_id)
+                )
+            """)
+
+            # Latest-scan lookups and per-scan findings joins in get_summary
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_scan_results_host_timestamp
+                ON scan_results (host_id, timestamp)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_findings_result_id
+                ON findings (result_id)
+            """)
+
+            cursor.execute("""
                 CREATE TABLE IF NOT EXISTS remediation_plans (
                     plan_id TEXT PRIMARY KEY,
                     host_id TEXT NOT NULL,
@@ -48,11 +116,13 @@ class DatabaseManager:
                 )
             """)
 
+            conn.commit()
+
     async def store_scan_results(self, results: Dict[str, Any]) -> str:
         """Store scan results from an agent"""
         result_id = f"result_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{results['hostname']}"
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             # Update or insert host
             await db.execute("""
                 INSERT OR REPLACE INTO hosts (host_id, hostname, last_seen, status)
@@ -72,52 +142,82 @@ class DatabaseManager:
                 result_id,
                 results['hostname'],
                 results['timestamp'],
-                json.dumps(results['findings'])
+                orjson.dumps(results['findings']).decode()
             ))
 
+            # Store individual findings for aggregate queries
+            await db.executemany("""
+                INSERT INTO findings (result_id, severity, rule_id, title, status, description, fix)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(
+                result_id,
+                finding.get('severity', ''),
+                finding.get('rule_id', ''),
+                finding.get('title', ''),
+                finding.get('status', ''),
+                finding.get('description', ''),
+                finding.get('fix')
+            ) for finding in results['findings']])
+
             await db.commit()
 
         return result_id
 
     async def get_host_results(self, hostname: str) -> List[Dict[str, Any]]:
         """Get scan results for a specific host"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute("""
-                SELECT result_id, timestamp, findings
-                FROM scan_results
-                WHERE host_id = ?
-                ORDER BY timestamp DESC
-            """, (hostname,)) as cursor:
-                results = await cursor.fetchall()
-                
-                return [{
-                    "result_id": row[0],
-                    "timestamp": row[1],
-                    "findings": json.loads(row[2])
-                } for row in results]
+        db = self._db
+        async with db.execute("""
+            SELECT result_id, timestamp, findings
+            FROM scan_results
+            WHERE host_id = ?
+            ORDER BY timestamp DESC
+        """, (hostname,)) as cursor:
+            results = await cursor.fetchall()
+            
+            return [{
+                "result_id": row[0],
+                "timestamp": row[1],
+                "findings": orjson.loads(row[2])
+            } for row in results]
 
     async def get_summary(self) -> Dict[str, Any]:
         """Get summary of all hosts"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # Get host count
-            async with db.execute("SELECT COUNT(*) FROM hosts") as cursor:
-                host_count = (await cursor.fetchone())[0]
-
-            # Get recent scans
-            async with db.execute("""
-                SELECT h.hostname, s.timestamp, s.findings
-                FROM hosts h
-                JOIN scan_results s ON h.host_id = s.host_id
-                ORDER BY s.timestamp DESC
-                LIMIT 10
-            """) as cursor:
-                recent_scans = [{
-                    "hostname": row[0],
-                    "timestamp": row[1],
-                    "findings": json.loads(row[2])
-                } for row in await cursor.fetchall()]
-
-            return {
-                "total_hosts": host_count,
-                "recent_scans": recent_scans
-            } 
\ No newline at end of file
+        db = self._db
+
+        # Get host count
+        async with db.execute("SELECT COUNT(*) FROM hosts") as cursor:
+            host_count = (await cursor.fetchone())[0]
+
+        # Get recent scans
+        async with db.execute("""
+            SELECT h.hostname, s.timestamp, s.findings
+            FROM hosts h
+            JOIN scan_results s ON h.host_id = s.host_id
+            ORDER BY s.timestamp DESC
+            LIMIT 10
+        """) as cursor:
+            recent_scans = [{
+                "hostname": row[0],
+                "timestamp": row[1],
+                "findings": orjson.loads(row[2])
+            } for row in await cursor.fetchall()]
+
+        # Count findings by severity in each host's latest scan
+        async with db.execute("""
+            SELECT f.severity, COUNT(*)
+            FROM (
+                SELECT host_id, MAX(timestamp) AS timestamp
+                FROM scan_results
+                GROUP BY host_id
+            ) latest
+            JOIN scan_results s ON s.host_id = latest.host_id AND s.timestamp = latest.timestamp
+            JOIN findings f ON f.result_id = s.result_id
+            GROUP BY f.severity
+        """) as cursor:
+            severity_counts = dict(await cursor.fetchall())
+
+        return {
+            "total_hosts": host_count,
+            "recent_scans": recent_scans,
+            "severity_counts": severity_counts
+        } 
\ No newline at end of file
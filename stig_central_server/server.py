@@ -1,5 +1,5 @@
-from fastapi import FastAPI, HTTPException, Depends, Security
-from fastapi.security.api_key import APIKeyHeader
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Dict, Any
 import logging
@@ -8,11 +8,13 @@ from datetime import datetime
 from pathlib import Path
 
 from .database import DatabaseManager
-from .auth import verify_api_key
+from .auth import require_api_key, load_api_keys
 from .models import ScanResult, RemediationPlan
 
-app = FastAPI(title="STIG Central Management Server")
-db = DatabaseManager()
+app = FastAPI(
+    title="STIG Central Management Server",
+    default_response_class=ORJSONResponse
+)
 logger = logging.getLogger(__name__)
 
 # Setup CORS
@@ -24,44 +26,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-API_KEY_HEADER = APIKeyHeader(name="X-API-Key")
+@app.on_event("startup")
+async def startup():
+    """Open the shared database connection and load API keys"""
+    app.state.db = DatabaseManager()
+    await app.state.db.connect()
+    load_api_keys()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the shared database connection"""
+    await app.state.db.close()
 
 @app.post("/api/v1/results")
 async def submit_results(
+    request: Request,
     scan_results: ScanResult,
-    api_key: str = Security(API_KEY_HEADER)
+    _: str = Depends(require_api_key)
 ):
     """Submit scan results from an agent"""
-    try:
-        await verify_api_key(api_key)
-        result_id = await db.store_scan_results(scan_results)
-        return {"status": "success", "result_id": result_id}
-    except Exception as e:
-        logger.error(f"Error storing scan results: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    result_id = await request.app.state.db.store_scan_results(scan_results)
+    return {"status": "success", "result_id": result_id}
 
 @app.get("/api/v1/results/{host}")
 async def get_host_results(
+    request: Request,
     host: str,
-    api_key: str = Security(API_KEY_HEADER)
+    _: str = Depends(require_api_key)
 ):
     """Get scan results for a specific host"""
-    try:
-        await verify_api_key(api_key)
-        results = await db.get_host_results(host)
-        return results
-    except Exception as e:
-        logger.error(f"Error retrieving results for host {host}: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return await request.app.state.db.get_host_results(host)
 
 @app.get("/api/v1/summary")
 async def get_summary(
-    api_key: str = Security(API_KEY_HEADER)
+    request: Request,
+    _: str = Depends(require_api_key)
 ):
     """Get summary of all hosts"""
-    try:
-        await verify_api_key(api_key)
-        return await db.get_summary()
-    except Exception as e:
-        logger.error(f"Error retrieving summary: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+    return await request.app.state.db.get_summary() 
\ No newline at end of file
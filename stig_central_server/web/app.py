@@ -1,9 +1,13 @@
 from fastapi import FastAPI, Request
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from pathlib import Path
 
-app = FastAPI(title="STIG Central Management UI")
+app = FastAPI(
+    title="STIG Central Management UI",
+    default_response_class=ORJSONResponse
+)
 templates = Jinja2Templates(directory="templates")
 
 # Mount static files
@@ -1,30 +1,152 @@
 import platform
 import subprocess
-import winreg
-import json
+import codecs
+import tempfile
+import orjson
 from datetime import datetime
 import socket
 import os
+import re
 import sys
-from typing import Dict, List, Any
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from typing import Dict, List, Any, NamedTuple, Tuple
+
+# Host details do not change for the lifetime of the process
+HOSTNAME = socket.gethostname()
+OS_INFO = platform.platform()
+
+# Captures the password policy values checked in a secedit export
+POLICY_RE = re.compile(rb'^(MinimumPasswordLength|PasswordComplexity)\s*=\s*(\S+)', re.MULTILINE)
+
+class RegistryCheck(NamedTuple):
+    path: str
+    name: str
+    expected_value: int
+    rule_id: str
+    title: str
+    description: str
+    severity: str
+
+class ServiceCheck(NamedTuple):
+    name: str
+    expected_state: str
+    rule_id: str
+    title: str
+    description: str
+    severity: str
 
 class STIGScanner:
+    REGISTRY_CHECKS: Tuple[RegistryCheck, ...] = (
+        RegistryCheck(
+            path=r'SOFTWARE\Microsoft\Windows\CurrentVersion\Policies\System',
+            name='NoConnectedUser',
+            expected_value=1,
+            rule_id='V-63447',
+            title='Microsoft Accounts',
+            description='Microsoft accounts must not be used for local account authentication.',
+            severity='medium'
+        ),
+        RegistryCheck(
+            path=r'SOFTWARE\Microsoft\Windows\CurrentVersion\Policies\System',
+            name='EnableLUA',
+            expected_value=1,
+            rule_id='V-63449',
+            title='User Account Control',
+            description='User Account Control must be enabled.',
+            severity='high'
+        )
+    )
+
+    SERVICE_CHECKS: Tuple[ServiceCheck, ...] = (
+        ServiceCheck(
+            name='RemoteRegistry',
+            expected_state='stopped',
+            rule_id='V-63545',
+            title='Remote Registry Service',
+            description='Remote Registry service must be disabled.',
+            severity='medium'
+        ),
+        ServiceCheck(
+            name='Telnet',
+            expected_state='stopped',
+            rule_id='V-63547',
+            title='Telnet Service',
+            description='Telnet service must be disabled.',
+            severity='high'
+        )
+    )
+
     def __init__(self):
         self.findings = []
-        self.hostname = socket.gethostname()
-        self.os_info = platform.platform()
+        self.hostname = HOSTNAME
+        self.os_info = OS_INFO
+        self._system_state = None
+        self._system_state_error = None
+        self._system_state_lock = threading.Lock()
+
+    def _query_system_state(self) -> Dict[str, Any]:
+        """Read all checked registry values and service states with one PowerShell call"""
+        with self._system_state_lock:
+            if self._system_state_error is not None:
+                raise self._system_state_error
+
+            if self._system_state is None:
+                registry = '; '.join(
+                    f"'{check.rule_id}' = (Get-ItemProperty -Path 'HKLM:\\{check.path}' "
+                    f"-ErrorAction SilentlyContinue).{check.name}"
+                    for check in self.REGISTRY_CHECKS
+                )
+                services = ','.join(service.name for service in self.SERVICE_CHECKS)
+                script = (
+                    f"@{{reg=@{{{registry}}}; svc=@(Get-Service -Name {services} -ErrorAction SilentlyContinue | "
+                    "ForEach-Object { @{name=$_.Name; status=$_.Status.ToString()} })} | "
+                    "ConvertTo-Json -Compress -Depth 4"
+                )
+                try:
+                    result = subprocess.run(
+                        ['powershell', '-NoProfile', '-Command', script],
+                        capture_output=True,
+                        check=True
+                    )
+                    state = orjson.loads(result.stdout)
+                except Exception as e:
+                    # Report the same failure to every check without re-running PowerShell
+                    self._system_state_error = e
+                    raise
+
+                self._system_state = {
+                    'reg': state.get('reg') or {},
+                    'svc': {service['name']: service['status'] for service in state.get('svc') or []}
+                }
+
+            return self._system_state
         
     def check_password_policy(self) -> None:
         """Check Windows password policy settings"""
         try:
-            # Using SecEdit to export security policy
-            subprocess.run(['secedit', '/export', '/cfg', 'secpol.cfg'], capture_output=True)
-            
-            with open('secpol.cfg', 'r') as file:
-                policy_data = file.read()
+            # Using SecEdit to export security policy to a unique temporary file
+            with tempfile.NamedTemporaryFile(delete=False, suffix='.cfg') as file:
+                cfg_path = file.name
+
+            try:
+                subprocess.run(['secedit', '/export', '/cfg', cfg_path], capture_output=True)
+
+                with open(cfg_path, 'rb') as file:
+                    policy_data = file.read()
+            finally:
+                # Cleanup temporary file
+                os.unlink(cfg_path)
+
+            # SecEdit writes its export as UTF-16
+            if policy_data.startswith(codecs.BOM_UTF16_LE):
+                policy_data = policy_data.decode('utf-16').encode()
+
+            policy = dict(POLICY_RE.findall(policy_data))
                 
             # Check minimum password length
-            if 'MinimumPasswordLength = 14' not in policy_data:
+            if policy.get(b'MinimumPasswordLength') != b'14':
                 self.findings.append({
                     'severity': 'high',
                     'rule_id': 'V-63405',
@@ -35,7 +157,7 @@ class STIGScanner:
                 })
                 
             # Check password complexity
-            if 'PasswordComplexity = 1' not in policy_data:
+            if policy.get(b'PasswordComplexity') != b'1':
                 self.findings.append({
                     'severity': 'high',
                     'rule_id': 'V-63407',
@@ -44,9 +166,6 @@ class STIGScanner:
                     'description': 'Password complexity requirements must be enabled.',
                     'fix': 'Enable password complexity requirements in Security Policy.'
                 })
-                
-            # Cleanup temporary file
-            os.remove('secpol.cfg')
             
         except Exception as e:
             self.findings.append({
@@ -88,48 +207,27 @@ class STIGScanner:
 
     def check_registry_settings(self) -> None:
         """Check Windows registry settings for STIG compliance"""
-        registry_checks = [
-            {
-                'path': r'SOFTWARE\Microsoft\Windows\CurrentVersion\Policies\System',
-                'name': 'NoConnectedUser',
-                'expected_value': 1,
-                'rule_id': 'V-63447',
-                'title': 'Microsoft Accounts',
-                'description': 'Microsoft accounts must not be used for local account authentication.',
-                'severity': 'medium'
-            },
-            {
-                'path': r'SOFTWARE\Microsoft\Windows\CurrentVersion\Policies\System',
-                'name': 'EnableLUA',
-                'expected_value': 1,
-                'rule_id': 'V-63449',
-                'title': 'User Account Control',
-                'description': 'User Account Control must be enabled.',
-                'severity': 'high'
-            }
-        ]
-
-        for check in registry_checks:
+        for check in self.REGISTRY_CHECKS:
             try:
-                key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, check['path'], 0, winreg.KEY_READ)
-                value, _ = winreg.QueryValueEx(key, check['name'])
-                winreg.CloseKey(key)
+                value = self._query_system_state()['reg'].get(check.rule_id)
+                if value is None:
+                    raise FileNotFoundError(f"{check.path}\\{check.name} not found")
 
-                if value != check['expected_value']:
+                if value != check.expected_value:
                     self.findings.append({
-                        'severity': check['severity'],
-                        'rule_id': check['rule_id'],
-                        'title': check['title'],
+                        'severity': check.severity,
+                        'rule_id': check.rule_id,
+                        'title': check.title,
                         'status': 'Open',
-                        'description': check['description'],
-                        'fix': f"Set registry value {check['path']}\\{check['name']} to {check['expected_value']}"
+                        'description': check.description,
+                        'fix': f"Set registry value {check.path}\\{check.name} to {check.expected_value}"
                     })
 
             except Exception as e:
                 self.findings.append({
                     'severity': 'info',
                     'rule_id': 'CHECK-ERROR',
-                    'title': f"Registry Check Error - {check['title']}",
+                    'title': f"Registry Check Error - {check.title}",
                     'status': 'Error',
                     'description': f"Error checking registry setting: {str(e)}",
                     'fix': 'Ensure you have appropriate permissions to read registry settings.'
@@ -137,44 +235,25 @@ class STIGScanner:
 
     def check_service_settings(self) -> None:
         """Check Windows service settings"""
-        services_to_check = [
-            {
-                'name': 'RemoteRegistry',
-                'expected_state': 'stopped',
-                'rule_id': 'V-63545',
-                'title': 'Remote Registry Service',
-                'description': 'Remote Registry service must be disabled.',
-                'severity': 'medium'
-            },
-            {
-                'name': 'Telnet',
-                'expected_state': 'stopped',
-                'rule_id': 'V-63547',
-                'title': 'Telnet Service',
-                'description': 'Telnet service must be disabled.',
-                'severity': 'high'
-            }
-        ]
-
-        for service in services_to_check:
+        for service in self.SERVICE_CHECKS:
             try:
-                result = subprocess.run(['sc', 'query', service['name']], capture_output=True, text=True)
+                state = self._query_system_state()['svc'].get(service.name, '')
                 
-                if 'RUNNING' in result.stdout and service['expected_state'] == 'stopped':
+                if state == 'Running' and service.expected_state == 'stopped':
                     self.findings.append({
-                        'severity': service['severity'],
-                        'rule_id': service['rule_id'],
-                        'title': service['title'],
+                        'severity': service.severity,
+                        'rule_id': service.rule_id,
+                        'title': service.title,
                         'status': 'Open',
-                        'description': service['description'],
-                        'fix': f"Stop and disable the {service['name']} service."
+                        'description': service.description,
+                        'fix': f"Stop and disable the {service.name} service."
                     })
 
             except Exception as e:
                 self.findings.append({
                     'severity': 'info',
                     'rule_id': 'CHECK-ERROR',
-                    'title': f"Service Check Error - {service['title']}",
+                    'title': f"Service Check Error - {service.title}",
                     'status': 'Error',
                     'description': f"Error checking service: {str(e)}",
                     'fix': 'Ensure you have appropriate permissions to query services.'
@@ -184,32 +263,39 @@ class STIGScanner:
         """Run all STIG compliance checks"""
         print(f"Starting STIG scan on {self.hostname} at {datetime.now()}")
         
-        # Run all checks
-        self.check_password_policy()
-        self.check_audit_policy()
-        self.check_registry_settings()
-        self.check_service_settings()
+        # Run all checks concurrently; they mostly wait on subprocesses and
+        # only append to self.findings, which is atomic under the GIL
+        checks = [
+            self.check_password_policy,
+            self.check_audit_policy,
+            self.check_registry_settings,
+            self.check_service_settings
+        ]
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            for future in [executor.submit(check) for check in checks]:
+                future.result()
 
     def generate_report(self) -> None:
         """Generate scan report"""
+        severity_counts = Counter(f['severity'] for f in self.findings)
         report = {
             'scan_info': {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': datetime.now(),
                 'hostname': self.hostname,
                 'os_info': self.os_info
             },
             'findings': self.findings,
             'summary': {
-                'total_findings': len(self.findings),
-                'high_severity': len([f for f in self.findings if f['severity'] == 'high']),
-                'medium_severity': len([f for f in self.findings if f['severity'] == 'medium']),
-                'low_severity': len([f for f in self.findings if f['severity'] == 'low'])
+                'total_findings': sum(severity_counts.values()),
+                'high_severity': severity_counts['high'],
+                'medium_severity': severity_counts['medium'],
+                'low_severity': severity_counts['low']
             }
         }
 
         # Save report to file
-        with open('stig_scan_report.json', 'w') as f:
-            json.dump(report, f, indent=4)
+        with open('stig_scan_report.json', 'wb') as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
 
         # Print summary to console
         print("\nScan Summary:")
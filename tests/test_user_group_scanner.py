@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+from ubuntu_stig_agent.scanners.user_group_scanner import _scan_sudoers_nopasswd
+
+class SudoersNopasswdTest(unittest.TestCase):
+    """Detection of active NOPASSWD tags in sudoers"""
+
+    def _check(self, content: bytes) -> bool:
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(content)
+        try:
+            return _scan_sudoers_nopasswd(f.name)
+        finally:
+            os.unlink(f.name)
+
+    def test_active_rule(self):
+        self.assertTrue(self._check(b"%admin ALL=(ALL) NOPASSWD: ALL\n"))
+
+    def test_numeric_uid_rule(self):
+        self.assertTrue(self._check(b"#1000 ALL=(ALL) NOPASSWD: ALL\n"))
+
+    def test_commented_rule(self):
+        self.assertFalse(self._check(b"# %admin ALL=(ALL) NOPASSWD: ALL\n#includedir /etc/sudoers.d\n"))
+
+    def test_trailing_comment(self):
+        self.assertFalse(self._check(b"root ALL=(ALL) ALL # no NOPASSWD here\n"))
+
+    def test_empty_file(self):
+        self.assertFalse(self._check(b""))
+
+if __name__ == "__main__":
+    unittest.main()
\ No newline at end of file
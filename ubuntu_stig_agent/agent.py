@@ -1,11 +1,16 @@
 import asyncio
 import logging
 import json
+import multiprocessing
 import os
+import random
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Any
 from pathlib import Path
+import httpx
+import orjson
 
 from .scanners import (
     FilePermissionScanner,
@@ -20,18 +25,63 @@ from .database import DatabaseManager
 from .reporting import ReportGenerator
 from .utils import setup_logging, encrypt_data, decrypt_data
 
+# Hostname does not change for the lifetime of the process
+HOSTNAME = os.uname()[1]
+
+# Retry delays after a failed iteration start here and double up to RETRY_DELAY
+INITIAL_RETRY_DELAY = 1.0
+RETRY_DELAY = 60.0
+
+# Syscall-heavy scanners run in worker processes, clear of the GIL. Scanners grouped
+# together share a worker, and with it the config_files.read_config cache.
+PROCESS_SCANNER_GROUPS = (
+    {"file_permissions": FilePermissionScanner},
+    {"services": ServiceScanner, "security_config": SecurityConfigScanner}
+)
+
+async def _scan_group(group: Dict[str, Any]) -> List[Any]:
+    """Run a group's scanners concurrently, returning each one's findings or exception"""
+    return await asyncio.gather(*(scanner().scan() for scanner in group.values()), return_exceptions=True)
+
+def _scan_in_process(group_idx: int) -> bytes:
+    """Run one of PROCESS_SCANNER_GROUPS inside a worker process, returning per-scanner results as JSON"""
+    group = PROCESS_SCANNER_GROUPS[group_idx]
+    results = asyncio.run(_scan_group(group))
+    # One bytes object crosses the process boundary instead of a pickled dict per finding
+    return orjson.dumps({
+        name: {"error": str(result)} if isinstance(result, Exception) else {"findings": result}
+        for name, result in zip(group, results)
+    })
+
 class STIGAgent:
     def __init__(self, config_path: str = "/etc/stig-agent/config.json"):
         self.config = self._load_config(config_path)
         self.logger = setup_logging(self.config.get("log_level", "INFO"))
         self.db = DatabaseManager(self.config["database_path"])
         self.remediation_mgr = RemediationManager(self.db)
+        # Kept for the agent's lifetime so its loaded template is reused across reports
+        self.report_gen = ReportGenerator()
+
+        # Reuse one HTTP/2 connection to the central server across scans
+        central_server = self.config.get("central_server")
+        self._client = httpx.AsyncClient(
+            http2=True,
+            verify=central_server.get("verify_ssl", True),
+            limits=httpx.Limits(max_keepalive_connections=4),
+            timeout=30.0
+        ) if central_server else None
+        
+        # Spawned rather than forked: the parent already runs threads (aiosqlite, executors).
+        # Spawned workers start with bare logging, so apply the agent's config in each one.
+        self._scan_pool = ProcessPoolExecutor(
+            max_workers=len(PROCESS_SCANNER_GROUPS),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_logging,
+            initargs=(self.config.get("log_level", "INFO"),)
+        )
         
-        # Initialize scanners
+        # Initialize in-process scanners
         self.scanners = {
-            "file_permissions": FilePermissionScanner(),
-            "services": ServiceScanner(),
-            "security_config": SecurityConfigScanner(),
             "users_groups": UserGroupScanner(),
             "network": NetworkScanner(),
             "software": SoftwareScanner()
@@ -50,22 +100,51 @@ class STIGAgent:
         self.logger.info("Starting STIG compliance scan")
         scan_results = {
             "timestamp": datetime.now().isoformat(),
-            "hostname": os.uname()[1],
+            "hostname": HOSTNAME,
             "findings": []
         }
 
-        for scanner_name, scanner in self.scanners.items():
-            try:
-                self.logger.info(f"Running {scanner_name} scan")
-                results = await scanner.scan()
-                scan_results["findings"].extend(results)
-            except Exception as e:
-                self.logger.error(f"Error in {scanner_name} scan: {str(e)}")
+        # Scanners are independent, so run them concurrently
+        results = await asyncio.gather(
+            *(self._run_scanners_in_process(group_idx) for group_idx in range(len(PROCESS_SCANNER_GROUPS))),
+            *(self._run_scanner(scanner_name, scanner) for scanner_name, scanner in self.scanners.items())
+        )
+        for findings in results:
+            scan_results["findings"].extend(findings)
 
         # Store results in database
-        await self.db.store_scan_results(scan_results)
+        scan_results["scan_id"] = await self.db.store_scan_results(scan_results)
         return scan_results
 
+    async def _run_scanner(self, scanner_name: str, scanner) -> List[Dict[str, Any]]:
+        """Run a single scanner, logging and discarding its failure"""
+        try:
+            self.logger.info(f"Running {scanner_name} scan")
+            return await scanner.scan()
+        except Exception as e:
+            self.logger.error(f"Error in {scanner_name} scan: {str(e)}")
+            return []
+
+    async def _run_scanners_in_process(self, group_idx: int) -> List[Dict[str, Any]]:
+        """Run a scanner group in the worker pool, logging and discarding failures"""
+        group = PROCESS_SCANNER_GROUPS[group_idx]
+        for scanner_name in group:
+            self.logger.info(f"Running {scanner_name} scan")
+        try:
+            loop = asyncio.get_running_loop()
+            results = orjson.loads(await loop.run_in_executor(self._scan_pool, _scan_in_process, group_idx))
+        except Exception as e:
+            self.logger.error(f"Error in {', '.join(group)} scan: {str(e)}")
+            return []
+
+        findings = []
+        for scanner_name, result in results.items():
+            if "error" in result:
+                self.logger.error(f"Error in {scanner_name} scan: {result['error']}")
+                continue
+            findings.extend(result["findings"])
+        return findings
+
     async def generate_remediation_plan(self, scan_results: Dict[str, Any]) -> Dict[str, Any]:
         """Generate remediation plan for scan findings"""
         return await self.remediation_mgr.create_plan(scan_results)
@@ -76,33 +155,45 @@ class STIGAgent:
 
     async def generate_report(self, scan_id: str, format: str = "json") -> str:
         """Generate compliance report"""
-        report_gen = ReportGenerator()
         scan_data = await self.db.get_scan_results(scan_id)
-        return await report_gen.generate(scan_data, format)
+        return await self.report_gen.generate(scan_data, format)
 
     async def start(self):
         """Start the agent service"""
         self.logger.info("Starting STIG Agent service")
-        while True:
-            try:
-                # Run scan based on configured schedule
-                if self._should_run_scan():
-                    scan_results = await self.run_scan()
-                    
-                    # Generate remediation plan
-                    plan = await self.generate_remediation_plan(scan_results)
-                    
-                    # Generate and store report
-                    report = await self.generate_report(scan_results["scan_id"])
-                    
-                    # Send results to central server if configured
-                    if self.config.get("central_server"):
-                        await self._send_results_to_server(scan_results)
-
-                await asyncio.sleep(self.config.get("scan_interval", 3600))
-            except Exception as e:
-                self.logger.error(f"Error in agent main loop: {str(e)}")
-                await asyncio.sleep(60)  # Wait before retry
+        await self.db.connect()
+        scan_interval = self.config.get("scan_interval", 3600)
+        backoff = INITIAL_RETRY_DELAY
+        try:
+            while True:
+                try:
+                    # Run scan based on configured schedule
+                    if self._should_run_scan():
+                        scan_results = await self.run_scan()
+                        
+                        # Generate remediation plan
+                        plan = await self.generate_remediation_plan(scan_results)
+                        
+                        # Generate and store report
+                        report = await self.generate_report(scan_results["scan_id"])
+                        
+                        # Send results to central server if configured
+                        if self.config.get("central_server"):
+                            await self._send_results_to_server(scan_results)
+
+                    # Jitter the interval so agents do not submit in lockstep
+                    backoff = INITIAL_RETRY_DELAY
+                    await asyncio.sleep(scan_interval * random.uniform(0.9, 1.1))
+                except Exception as e:
+                    self.logger.error(f"Error in agent main loop: {str(e)}")
+                    # Exponential backoff with jitter before retry
+                    await asyncio.sleep(backoff * random.uniform(0.8, 1.2))
+                    backoff = min(backoff * 2, RETRY_DELAY)
+        finally:
+            self._scan_pool.shutdown(wait=False)
+            if self._client is not None:
+                await self._client.aclose()
+            await self.db.close()
 
     def _should_run_scan(self) -> bool:
         """Check if scan should be run based on schedule"""
@@ -115,10 +206,23 @@ class STIGAgent:
             return
 
         try:
-            # Implement secure communication with central server
-            encrypted_data = encrypt_data(results, self.config["server_public_key"])
-            # Send data to server
-            # TODO: Implement server communication
+            central_server = self.config["central_server"]
+            url = f"{central_server['url'].rstrip('/')}/api/v1/results"
+            headers = {
+                "X-API-Key": central_server["api_key"],
+                "Content-Type": "application/json"
+            }
+            body = orjson.dumps(results)
+
+            # Retry briefly on server errors
+            attempts = 3
+            for attempt in range(attempts):
+                response = await self._client.post(url, content=body, headers=headers)
+                if response.status_code < 500 or attempt == attempts - 1:
+                    break
+                await asyncio.sleep(2 ** attempt)
+
+            response.raise_for_status()
         except Exception as e:
             self.logger.error(f"Failed to send results to server: {str(e)}")
 
@@ -1,18 +1,39 @@
 import sqlite3
-import json
+import orjson
 import asyncio
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from typing import Dict, List, Any
+from contextlib import asynccontextmanager
 from pathlib import Path
 import aiosqlite
 import logging
 
+# Per-connection tuning; journal_mode=WAL persists in the database file
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+_last_id_ns = 0
+
+def _new_id(prefix: str, suffix: str) -> str:
+    """Build a record id from a strictly increasing nanosecond timestamp"""
+    global _last_id_ns
+    _last_id_ns = max(time.time_ns(), _last_id_ns + 1)
+    return f"{prefix}_{_last_id_ns}_{suffix}"
+
 class DatabaseManager:
     """Manages all database operations for the STIG agent"""
     
     def __init__(self, db_path: str = "/var/lib/stig-agent/stig.db"):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
+        self._db = None
+        self._write_lock = None
         self._ensure_db_directory()
         self._init_database()
 
@@ -20,10 +41,38 @@ class DatabaseManager:
         """Ensure the database directory exists"""
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
+    async def connect(self) -> None:
+        """Open the shared database connection"""
+        if self._db is None:
+            self._db = await aiosqlite.connect(self.db_path)
+            for pragma in PRAGMAS:
+                await self._db.execute(pragma)
+            # SQLite allows a single writer; serialize writes on the shared connection
+            self._write_lock = asyncio.Lock()
+
+    async def close(self) -> None:
+        """Close the shared database connection"""
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    @asynccontextmanager
+    async def _writer(self):
+        """Yield the shared connection with exclusive write access"""
+        async with self._write_lock:
+            try:
+                yield self._db
+            except BaseException:
+                # Leave no open transaction behind on the shared connection
+                await self._db.rollback()
+                raise
+
     def _init_database(self) -> None:
         """Initialize database schema"""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
+            for pragma in PRAGMAS:
+                cursor.execute(pragma)
             
             # Create scans table
             cursor.execute("""
@@ -31,7 +80,7 @@ class DatabaseManager:
                     scan_id TEXT PRIMARY KEY,
                     timestamp TEXT NOT NULL,
                     hostname TEXT NOT NULL,
-                    findings TEXT NOT NULL,
+                    findings BLOB NOT NULL,
                     status TEXT NOT NULL
                 )
             """)
@@ -42,7 +91,7 @@ class DatabaseManager:
                     plan_id TEXT PRIMARY KEY,
                     scan_id TEXT NOT NULL,
                     timestamp TEXT NOT NULL,
-                    items TEXT NOT NULL,
+                    items BLOB NOT NULL,
                     status TEXT NOT NULL,
                     FOREIGN KEY (scan_id) REFERENCES scans (scan_id)
                 )
@@ -54,84 +103,107 @@ class DatabaseManager:
                     execution_id TEXT PRIMARY KEY,
                     plan_id TEXT NOT NULL,
                     timestamp TEXT NOT NULL,
-                    items TEXT NOT NULL,
+                    items BLOB NOT NULL,
                     status TEXT NOT NULL,
-                    result TEXT,
+                    result BLOB,
                     FOREIGN KEY (plan_id) REFERENCES remediation_plans (plan_id)
                 )
             """)
 
+            # Indexes for recent-scan, history and cleanup queries
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_scans_timestamp ON scans (timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_plan ON remediation_history (plan_id, timestamp DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_plans_timestamp ON remediation_plans (timestamp)")
+
             conn.commit()
 
     async def store_scan_results(self, scan_results: Dict[str, Any]) -> str:
         """Store scan results in the database"""
-        scan_id = f"scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{scan_results['hostname']}"
+        return (await self.store_scan_results_many([scan_results]))[0]
+
+    async def store_scan_results_many(self, results: List[Dict[str, Any]]) -> List[str]:
+        """Store several scan results in a single transaction"""
+        scan_ids = [
+            _new_id("scan", scan_results['hostname'])
+            for scan_results in results
+        ]
         
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
+        async with self._writer() as db:
+            await db.execute("BEGIN")
+            await db.executemany(
                 """
                 INSERT INTO scans (scan_id, timestamp, hostname, findings, status)
                 VALUES (?, ?, ?, ?, ?)
                 """,
-                (
+                [(
                     scan_id,
                     scan_results["timestamp"],
                     scan_results["hostname"],
-                    json.dumps(scan_results["findings"]),
+                    orjson.dumps(scan_results["findings"]),
                     "completed"
-                )
+                ) for scan_id, scan_results in zip(scan_ids, results)]
             )
             await db.commit()
 
-        self.logger.info(f"Stored scan results with ID: {scan_id}")
-        return scan_id
+        for scan_id in scan_ids:
+            self.logger.info(f"Stored scan results with ID: {scan_id}")
+        return scan_ids
 
     async def get_scan_results(self, scan_id: str) -> Dict[str, Any]:
         """Retrieve scan results from the database"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                "SELECT * FROM scans WHERE scan_id = ?",
-                (scan_id,)
-            ) as cursor:
-                row = await cursor.fetchone()
-                
-                if not row:
-                    raise ValueError(f"Scan ID {scan_id} not found")
-                
-                return {
-                    "scan_id": row[0],
-                    "timestamp": row[1],
-                    "hostname": row[2],
-                    "findings": json.loads(row[3]),
-                    "status": row[4]
-                }
+        db = self._db
+        async with db.execute(
+            "SELECT * FROM scans WHERE scan_id = ?",
+            (scan_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            
+            if not row:
+                raise ValueError(f"Scan ID {scan_id} not found")
+            
+            return {
+                "scan_id": row[0],
+                "timestamp": row[1],
+                "hostname": row[2],
+                "findings": orjson.loads(row[3]),
+                "status": row[4]
+            }
 
     async def store_remediation_plan(self, plan: Dict[str, Any]) -> str:
         """Store remediation plan in the database"""
-        plan_id = f"plan_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{plan['scan_id']}"
+        return (await self.store_remediation_plans_many([plan]))[0]
+
+    async def store_remediation_plans_many(self, plans: List[Dict[str, Any]]) -> List[str]:
+        """Store several remediation plans in a single transaction"""
+        plan_ids = [
+            _new_id("plan", plan['scan_id'])
+            for plan in plans
+        ]
         
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
+        async with self._writer() as db:
+            await db.execute("BEGIN")
+            await db.executemany(
                 """
                 INSERT INTO remediation_plans (plan_id, scan_id, timestamp, items, status)
                 VALUES (?, ?, ?, ?, ?)
                 """,
-                (
+                [(
                     plan_id,
                     plan["scan_id"],
                     datetime.now().isoformat(),
-                    json.dumps(plan["items"]),
+                    orjson.dumps(plan["items"]),
                     "pending"
-                )
+                ) for plan_id, plan in zip(plan_ids, plans)]
             )
             await db.commit()
 
-        self.logger.info(f"Stored remediation plan with ID: {plan_id}")
-        return plan_id
+        for plan_id in plan_ids:
+            self.logger.info(f"Stored remediation plan with ID: {plan_id}")
+        return plan_ids
 
     async def update_remediation_status(self, plan_id: str, status: str) -> None:
         """Update the status of a remediation plan"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
             await db.execute(
                 "UPDATE remediation_plans SET status = ? WHERE plan_id = ?",
                 (status, plan_id)
@@ -140,69 +212,81 @@ class DatabaseManager:
 
     async def store_remediation_execution(self, execution: Dict[str, Any]) -> str:
         """Store remediation execution results"""
-        execution_id = f"exec_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{execution['plan_id']}"
+        return (await self.store_remediation_executions_many([execution]))[0]
+
+    async def store_remediation_executions_many(self, executions: List[Dict[str, Any]]) -> List[str]:
+        """Store several remediation execution results in a single transaction"""
+        execution_ids = [
+            _new_id("exec", execution['plan_id'])
+            for execution in executions
+        ]
         
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
+        async with self._writer() as db:
+            await db.execute("BEGIN")
+            await db.executemany(
                 """
                 INSERT INTO remediation_history 
                 (execution_id, plan_id, timestamp, items, status, result)
                 VALUES (?, ?, ?, ?, ?, ?)
                 """,
-                (
+                [(
                     execution_id,
                     execution["plan_id"],
                     datetime.now().isoformat(),
-                    json.dumps(execution["items"]),
+                    orjson.dumps(execution["items"]),
                     execution["status"],
-                    json.dumps(execution.get("result", {}))
-                )
+                    orjson.dumps(execution.get("result", {}))
+                ) for execution_id, execution in zip(execution_ids, executions)]
             )
             await db.commit()
 
-        self.logger.info(f"Stored remediation execution with ID: {execution_id}")
-        return execution_id
+        for execution_id in execution_ids:
+            self.logger.info(f"Stored remediation execution with ID: {execution_id}")
+        return execution_ids
 
     async def get_remediation_history(self, plan_id: str) -> List[Dict[str, Any]]:
         """Retrieve remediation history for a plan"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                "SELECT * FROM remediation_history WHERE plan_id = ? ORDER BY timestamp DESC",
-                (plan_id,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                
-                return [{
-                    "execution_id": row[0],
-                    "plan_id": row[1],
-                    "timestamp": row[2],
-                    "items": json.loads(row[3]),
-                    "status": row[4],
-                    "result": json.loads(row[5]) if row[5] else None
-                } for row in rows]
+        db = self._db
+        async with db.execute(
+            "SELECT * FROM remediation_history WHERE plan_id = ? ORDER BY timestamp DESC",
+            (plan_id,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            
+            return [{
+                "execution_id": row[0],
+                "plan_id": row[1],
+                "timestamp": row[2],
+                "items": orjson.loads(row[3]),
+                "status": row[4],
+                "result": orjson.loads(row[5]) if row[5] else None
+            } for row in rows]
 
     async def get_recent_scans(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Retrieve recent scan results"""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute(
-                "SELECT * FROM scans ORDER BY timestamp DESC LIMIT ?",
-                (limit,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                
-                return [{
-                    "scan_id": row[0],
-                    "timestamp": row[1],
-                    "hostname": row[2],
-                    "findings": json.loads(row[3]),
-                    "status": row[4]
-                } for row in rows]
+        db = self._db
+        async with db.execute(
+            "SELECT * FROM scans ORDER BY timestamp DESC LIMIT ?",
+            (limit,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            
+            return [{
+                "scan_id": row[0],
+                "timestamp": row[1],
+                "hostname": row[2],
+                "findings": orjson.loads(row[3]),
+                "status": row[4]
+            } for row in rows]
 
     async def cleanup_old_data(self, days: int = 90) -> None:
         """Clean up old scan and remediation data"""
-        cutoff_date = (datetime.now() - datetime.timedelta(days=days)).isoformat()
+        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._writer() as db:
+            # Delete in foreign key order within a single transaction
+            await db.execute("BEGIN")
+
             # Delete old remediation history
             await db.execute(
                 "DELETE FROM remediation_history WHERE timestamp < ?",
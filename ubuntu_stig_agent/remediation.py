@@ -1,12 +1,71 @@
 import asyncio
+import aiofiles
 import logging
 import json
 import os
+import re
 import subprocess
-from typing import Dict, List, Any
+from functools import partial
+from typing import Dict, List, Any, FrozenSet, Optional, Pattern, Tuple
 from datetime import datetime
 from pathlib import Path
 import shutil
+from types import MappingProxyType
+
+def _copy_file(source: str, destination: str) -> None:
+    """Copy a file in-kernel where possible, preserving metadata"""
+    try:
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            remaining = os.fstat(src.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        shutil.copystat(source, destination)
+    except (AttributeError, OSError):
+        # copy_file_range is unavailable or unsupported across these mounts
+        shutil.copy2(source, destination)
+
+# Remediation steps by STIG rule ID
+REMEDIATION_MAP = MappingProxyType({
+    # Password Policy Remediations
+    "V-72427": {
+        "type": "package_install",
+        "package": "libpam-pwquality",
+        "config_file": "/etc/security/pwquality.conf",
+        "settings": {
+            "minlen": "14",
+            "dcredit": "-1",
+            "ucredit": "-1",
+            "lcredit": "-1",
+            "ocredit": "-1"
+        },
+        "backup_required": True
+    },
+    # SSH Configuration Remediations
+    "V-72433": {
+        "type": "file_edit",
+        "file": "/etc/ssh/sshd_config",
+        "changes": [
+            {"regex": "^Protocol.*", "replacement": "Protocol 2"},
+            {"append_if_not_found": "Protocol 2"}
+        ],
+        "service_restart": "ssh",
+        "backup_required": True
+    },
+    # Service Configuration Remediations
+    "V-72435": {
+        "type": "service_config",
+        "service": "ssh",
+        "config_file": "/etc/ssh/sshd_config",
+        "changes": [
+            {"regex": "^PermitRootLogin.*", "replacement": "PermitRootLogin no"},
+            {"append_if_not_found": "PermitRootLogin no"}
+        ],
+        "backup_required": True
+    }
+})
 
 class RemediationManager:
     """Manages remediation plans and executions for STIG findings"""
@@ -48,46 +107,7 @@ class RemediationManager:
 
     def _get_remediation_steps(self, finding: Dict[str, Any]) -> Dict[str, Any]:
         """Get remediation steps for a specific finding"""
-        remediation_map = {
-            # Password Policy Remediations
-            "V-72427": {
-                "type": "package_install",
-                "package": "libpam-pwquality",
-                "config_file": "/etc/security/pwquality.conf",
-                "settings": {
-                    "minlen": "14",
-                    "dcredit": "-1",
-                    "ucredit": "-1",
-                    "lcredit": "-1",
-                    "ocredit": "-1"
-                },
-                "backup_required": True
-            },
-            # SSH Configuration Remediations
-            "V-72433": {
-                "type": "file_edit",
-                "file": "/etc/ssh/sshd_config",
-                "changes": [
-                    {"regex": "^Protocol.*", "replacement": "Protocol 2"},
-                    {"append_if_not_found": "Protocol 2"}
-                ],
-                "service_restart": "ssh",
-                "backup_required": True
-            },
-            # Service Configuration Remediations
-            "V-72435": {
-                "type": "service_config",
-                "service": "ssh",
-                "config_file": "/etc/ssh/sshd_config",
-                "changes": [
-                    {"regex": "^PermitRootLogin.*", "replacement": "PermitRootLogin no"},
-                    {"append_if_not_found": "PermitRootLogin no"}
-                ],
-                "backup_required": True
-            }
-        }
-
-        return remediation_map.get(finding["rule_id"])
+        return REMEDIATION_MAP.get(finding["rule_id"])
 
     async def execute_plan(self, plan_id: str, approved_items: List[str]) -> Dict[str, Any]:
         """Execute approved remediation items"""
@@ -104,10 +124,24 @@ class RemediationManager:
         }
 
         try:
-            for item in plan["items"]:
-                if item["finding_id"] in approved_items:
-                    result = await self._execute_remediation_item(item)
-                    execution_results["items"].append(result)
+            items = [item for item in plan["items"] if item["finding_id"] in approved_items]
+
+            # Install all required packages with a single apt-get run
+            packages = sorted({
+                item["remediation"]["package"] for item in items
+                if item["remediation"]["type"] == "package_install"
+            })
+            installed_packages = frozenset()
+            if packages:
+                try:
+                    await self._install_packages(packages)
+                    installed_packages = frozenset(packages)
+                except Exception as e:
+                    self.logger.warning(f"Batched package install failed, installing individually: {str(e)}")
+
+            for item in items:
+                result = await self._execute_remediation_item(item, installed_packages)
+                execution_results["items"].append(result)
 
             execution_results["status"] = "completed"
             
@@ -122,7 +156,8 @@ class RemediationManager:
 
         return execution_results
 
-    async def _execute_remediation_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+    async def _execute_remediation_item(self, item: Dict[str, Any],
+                                        installed_packages: FrozenSet[str] = frozenset()) -> Dict[str, Any]:
         """Execute a single remediation item"""
         result = {
             "finding_id": item["finding_id"],
@@ -139,15 +174,10 @@ class RemediationManager:
             if remediation.get("backup_required"):
                 result["backup_path"] = await self._create_backup(remediation)
 
-            # Execute based on remediation type
-            if remediation["type"] == "package_install":
-                await self._handle_package_installation(remediation, result)
-            
-            elif remediation["type"] == "file_edit":
-                await self._handle_file_edit(remediation, result)
-            
-            elif remediation["type"] == "service_config":
-                await self._handle_service_config(remediation, result)
+            handler = RULE_HANDLERS.get(item["finding_id"])
+            if handler is None:
+                raise ValueError(f"No remediation handler for rule {item['finding_id']}")
+            await handler(self, result, installed_packages)
 
             result["status"] = "success"
 
@@ -174,7 +204,7 @@ class RemediationManager:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = self.backup_dir / f"{os.path.basename(source)}.{timestamp}.bak"
         
-        shutil.copy2(source, backup_path)
+        await asyncio.get_running_loop().run_in_executor(None, _copy_file, source, str(backup_path))
         return str(backup_path)
 
     async def _restore_from_backup(self, backup_path: str, remediation: Dict[str, Any]) -> None:
@@ -187,118 +217,189 @@ class RemediationManager:
             shutil.copy2(backup_path, target)
             self.logger.info(f"Restored {target} from backup {backup_path}")
 
-    async def _handle_package_installation(self, remediation: Dict[str, Any], result: Dict[str, Any]):
-        """Handle package installation remediation"""
-        package = remediation["package"]
-        
-        # Install package
+    async def _install_packages(self, packages: List[str]):
+        """Install one or more packages in a single apt-get run"""
         process = await asyncio.create_subprocess_exec(
-            "apt-get", "install", "-y", package,
-            stdout=asyncio.subprocess.PIPE,
+            "apt-get", "install", "-y", *packages,
+            stdout=asyncio.subprocess.DEVNULL,
             stderr=asyncio.subprocess.PIPE
         )
-        stdout, stderr = await process.communicate()
-        
+        _, stderr = await process.communicate()
+
         if process.returncode != 0:
-            raise Exception(f"Failed to install package {package}: {stderr.decode()}")
+            raise Exception(f"Failed to install package {' '.join(packages)}: {stderr.decode()}")
+
+    async def _handle_package_installation(self, result: Dict[str, Any], installed_packages: FrozenSet[str], *,
+                                           package: str, config_file: Optional[str] = None,
+                                           settings: Optional[Dict[str, str]] = None):
+        """Handle package installation remediation"""
+        # Install package unless the batched install already did
+        if package not in installed_packages:
+            await self._install_packages([package])
 
         result["changes_made"].append(f"Installed package {package}")
 
         # Configure if needed
-        if "config_file" in remediation and "settings" in remediation:
-            await self._update_config_file(
-                remediation["config_file"],
-                remediation["settings"],
-                result
-            )
-
-    async def _handle_file_edit(self, remediation: Dict[str, Any], result: Dict[str, Any]):
+        if config_file and settings:
+            await self._update_config_file(config_file, settings, result)
+
+    async def _handle_file_edit(self, result: Dict[str, Any], installed_packages: FrozenSet[str], *,
+                                file_path: str, rules: Tuple[Tuple[Pattern, str], ...],
+                                sentinels: Tuple[str, ...], service_restart: Optional[str] = None):
         """Handle file edit remediation"""
-        file_path = remediation["file"]
-        
-        with open(file_path, 'r') as f:
-            content = f.read()
-
-        new_content = content
-        for change in remediation["changes"]:
-            if "regex" in change:
-                import re
-                pattern = re.compile(change["regex"], re.MULTILINE)
-                new_content = pattern.sub(change["replacement"], new_content)
-                
-            if "append_if_not_found" in change and change["append_if_not_found"] not in new_content:
-                new_content = f"{new_content}\n{change['append_if_not_found']}"
+        async with aiofiles.open(file_path, 'r') as f:
+            content = await f.read()
+
+        # Rewrite the file in a single pass over its lines
+        lines = []
+        found = set()
+        for line in content.splitlines():
+            for pattern, replacement in rules:
+                line = pattern.sub(replacement, line)
+            for sentinel in sentinels:
+                if sentinel in line:
+                    found.add(sentinel)
+            lines.append(line)
+
+        lines.extend(sentinel for sentinel in sentinels if sentinel not in found)
+        new_content = "\n".join(lines)
+        if content.endswith("\n"):
+            new_content += "\n"
 
         if new_content != content:
-            with open(file_path, 'w') as f:
-                f.write(new_content)
+            await self._write_atomic(file_path, new_content)
             result["changes_made"].append(f"Updated {file_path}")
 
         # Restart service if required
-        if "service_restart" in remediation:
-            await self._restart_service(remediation["service_restart"])
-            result["changes_made"].append(f"Restarted service {remediation['service_restart']}")
+        if service_restart:
+            await self._restart_service(service_restart)
+            result["changes_made"].append(f"Restarted service {service_restart}")
 
-    async def _handle_service_config(self, remediation: Dict[str, Any], result: Dict[str, Any]):
+    async def _handle_service_config(self, result: Dict[str, Any], installed_packages: FrozenSet[str], *,
+                                     service: str, **edit):
         """Handle service configuration remediation"""
-        await self._handle_file_edit(remediation, result)
+        await self._handle_file_edit(result, installed_packages, **edit)
         
         # Ensure service is enabled and running
-        service = remediation["service"]
         await self._enable_service(service)
         result["changes_made"].append(f"Enabled service {service}")
 
     async def _update_config_file(self, file_path: str, settings: Dict[str, str], result: Dict[str, Any]):
         """Update configuration file with new settings"""
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
+        async with aiofiles.open(file_path, 'r') as f:
+            lines = await f.readlines()
+
+        formatted = {key: f"{key} = {value}" for key, value in settings.items()}
 
-        # Update existing settings or add new ones
+        # Update existing settings in place, leaving comments and formatting intact
         updated_lines = []
         settings_found = set()
+        changed = False
 
         for line in lines:
-            line = line.strip()
-            if '=' in line:
-                key = line.split('=')[0].strip()
-                if key in settings:
-                    updated_lines.append(f"{key} = {settings[key]}")
-                    settings_found.add(key)
-                    result["changes_made"].append(f"Updated {key} in {file_path}")
-                else:
-                    updated_lines.append(line)
-            else:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('#'):
                 updated_lines.append(line)
+                continue
+
+            key, sep, value = stripped.partition('=')
+            key = key.strip()
+            if sep and key in formatted:
+                settings_found.add(key)
+                if value.strip() != str(settings[key]):
+                    updated_lines.append(formatted[key] + '\n')
+                    result["changes_made"].append(f"Updated {key} in {file_path}")
+                    changed = True
+                    continue
+            updated_lines.append(line)
 
         # Add missing settings
-        for key, value in settings.items():
-            if key not in settings_found:
-                updated_lines.append(f"{key} = {value}")
-                result["changes_made"].append(f"Added {key} to {file_path}")
+        missing = [key for key in formatted if key not in settings_found]
+        if missing and updated_lines and not updated_lines[-1].endswith('\n'):
+            updated_lines[-1] += '\n'
+        for key in missing:
+            updated_lines.append(formatted[key] + '\n')
+            result["changes_made"].append(f"Added {key} to {file_path}")
+            changed = True
+
+        # Leave an already compliant file, and its mtime, untouched
+        if not changed:
+            return
 
-        with open(file_path, 'w') as f:
-            f.write('\n'.join(updated_lines))
+        await self._write_atomic(file_path, ''.join(updated_lines))
+
+    async def _write_atomic(self, file_path: str, content: str):
+        """Replace a file's content via a temporary file so it is never left half-written"""
+        tmp_path = file_path + ".tmp"
+        st = os.stat(file_path)
+        try:
+            async with aiofiles.open(tmp_path, 'w') as f:
+                await f.write(content)
+                await f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, st.st_mode & 0o7777)
+            os.chown(tmp_path, st.st_uid, st.st_gid)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
     async def _restart_service(self, service: str):
         """Restart a system service"""
         process = await asyncio.create_subprocess_exec(
             "systemctl", "restart", service,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
         )
-        await process.communicate()
+        await process.wait()
 
     async def _enable_service(self, service: str):
         """Enable a system service"""
         process = await asyncio.create_subprocess_exec(
             "systemctl", "enable", service,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL
         )
-        await process.communicate()
+        await process.wait()
 
     async def _get_plan(self, plan_id: str) -> Dict[str, Any]:
         """Get remediation plan from database"""
         # This method would need to be implemented in the DatabaseManager
         # For now, we'll assume it exists
-        return await self.db.get_remediation_plan(plan_id) 
\ No newline at end of file
+        return await self.db.get_remediation_plan(plan_id) 
+
+def _compile_handler(remediation: Dict[str, Any]):
+    """Bind a remediation entry to its handler with its arguments precomputed"""
+    if remediation["type"] == "package_install":
+        return partial(
+            RemediationManager._handle_package_installation,
+            package=remediation["package"],
+            config_file=remediation.get("config_file"),
+            settings=remediation.get("settings")
+        )
+
+    changes = remediation["changes"]
+    edit = {
+        "file_path": remediation.get("file") or remediation["config_file"],
+        "rules": tuple(
+            (re.compile(change["regex"], re.MULTILINE), change["replacement"])
+            for change in changes if "regex" in change
+        ),
+        "sentinels": tuple(
+            change["append_if_not_found"]
+            for change in changes if "append_if_not_found" in change
+        ),
+        "service_restart": remediation.get("service_restart")
+    }
+
+    if remediation["type"] == "file_edit":
+        return partial(RemediationManager._handle_file_edit, **edit)
+    if remediation["type"] == "service_config":
+        return partial(RemediationManager._handle_service_config, service=remediation["service"], **edit)
+    raise ValueError(f"Unknown remediation type {remediation['type']}")
+
+# Handlers by STIG rule ID, built once at import
+RULE_HANDLERS = MappingProxyType({
+    rule_id: _compile_handler(remediation) for rule_id, remediation in REMEDIATION_MAP.items()
+})
\ No newline at end of file
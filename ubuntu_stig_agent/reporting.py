@@ -1,17 +1,37 @@
-import json
+import orjson
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import jinja2
 import aiofiles
 import csv
-import io
+import re
+from functools import lru_cache
 from pathlib import Path
 import asyncio
 from weasyprint import HTML
-import matplotlib.pyplot as plt
+# Charts render in executor threads, so build figures on an Agg canvas directly
+# rather than through pyplot's global (not thread-safe) figure manager
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import numpy as np
 
+JINJA_CACHE_DIR = Path("/var/cache/stig-agent/jinja")
+
+# Positions of each status and severity in the tally arrays, in chart order
+STATUS_IDX = {"passed": 0, "failed": 1, "error": 2}
+SEVERITY_IDX = {"high": 0, "medium": 1, "low": 2}
+
+CSV_HEADER = ("Rule ID", "Title", "Severity", "Status", "Description", "Fix", "Check Type")
+_CSV_SPECIAL_RE = re.compile(r'[",\r\n]')
+
+@lru_cache(maxsize=4096)
+def _csv_escape(value: str) -> str:
+    """Quote a CSV field the way csv.writer would, only when needed"""
+    if _CSV_SPECIAL_RE.search(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
 class ReportGenerator:
     """Generates STIG compliance reports in various formats"""
     
@@ -20,10 +40,25 @@ class ReportGenerator:
         self.template_dir = Path(__file__).parent / "templates"
         self.template_env = jinja2.Environment(
             loader=jinja2.FileSystemLoader(str(self.template_dir)),
-            autoescape=jinja2.select_autoescape(['html', 'xml'])
+            autoescape=jinja2.select_autoescape(['html', 'xml']),
+            bytecode_cache=self._get_bytecode_cache(),
+            cache_size=-1,
+            auto_reload=False
         )
+        # Loaded on the first HTML render so JSON and CSV reports never touch it
+        self._report_template: Optional[jinja2.Template] = None
 
-    async def generate(self, scan_data: Dict[str, Any], format: str = "json") -> str:
+    def _get_bytecode_cache(self):
+        """Get a persistent template bytecode cache, if the cache directory is usable"""
+        try:
+            JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            self.logger.debug(f"Template bytecode cache disabled: {str(e)}")
+            return None
+        return jinja2.FileSystemBytecodeCache(str(JINJA_CACHE_DIR))
+
+    async def generate(self, scan_data: Dict[str, Any], format: str = "json",
+                       path: Optional[str] = None) -> str:
         """Generate a report in the specified format"""
         try:
             if format == "json":
@@ -33,7 +68,7 @@ class ReportGenerator:
             elif format == "pdf":
                 return await self._generate_pdf(scan_data)
             elif format == "csv":
-                return await self._generate_csv(scan_data)
+                return await self._generate_csv(scan_data, path)
             else:
                 raise ValueError(f"Unsupported format: {format}")
         except Exception as e:
@@ -43,18 +78,20 @@ class ReportGenerator:
     async def _generate_json(self, scan_data: Dict[str, Any]) -> str:
         """Generate a JSON report"""
         report = await self._prepare_report_data(scan_data)
-        return json.dumps(report, indent=2)
+        return orjson.dumps(report, option=orjson.OPT_INDENT_2).decode()
 
     async def _generate_html(self, scan_data: Dict[str, Any]) -> str:
         """Generate an HTML report"""
-        report_data = await self._prepare_report_data(scan_data)
+        counts = self._count_findings(scan_data["findings"])
+        report_data = await self._prepare_report_data(scan_data, counts)
         
         # Generate compliance charts
-        charts = await self._generate_charts(report_data)
+        charts = await self._generate_charts(counts)
         report_data["charts"] = charts
 
-        template = self.template_env.get_template("report.html")
-        return template.render(**report_data)
+        if self._report_template is None:
+            self._report_template = self.template_env.get_template("report.html")
+        return self._report_template.render(**report_data)
 
     async def _generate_pdf(self, scan_data: Dict[str, Any]) -> str:
         """Generate a PDF report"""
@@ -65,21 +102,11 @@ class ReportGenerator:
         HTML(string=html_content).write_pdf(output_path)
         return output_path
 
-    async def _generate_csv(self, scan_data: Dict[str, Any]) -> str:
-        """Generate a CSV report"""
+    async def _generate_csv(self, scan_data: Dict[str, Any], path: Optional[str] = None) -> str:
+        """Generate a CSV report, written to path if one is given"""
         report_data = await self._prepare_report_data(scan_data)
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        # Write header
-        writer.writerow([
-            "Rule ID", "Title", "Severity", "Status", 
-            "Description", "Fix", "Check Type"
-        ])
-
-        # Write findings
-        for finding in report_data["findings"]:
-            writer.writerow([
+        rows = (
+            (
                 finding["rule_id"],
                 finding["title"],
                 finding["severity"],
@@ -87,20 +114,53 @@ class ReportGenerator:
                 finding["description"],
                 finding.get("fix", ""),
                 finding.get("check_type", "")
-            ])
-
-        return output.getvalue()
+            )
+            for finding in report_data["findings"]
+        )
 
-    async def _prepare_report_data(self, scan_data: Dict[str, Any]) -> Dict[str, Any]:
+        if path:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_csv, path, rows)
+            return path
+
+        lines = [",".join(CSV_HEADER)]
+        # csv.writer writes None as an empty field
+        lines.extend(",".join("" if value is None else _csv_escape(str(value)) for value in row) for row in rows)
+        lines.append("")
+        return "\r\n".join(lines)
+
+    def _write_csv(self, path: str, rows) -> None:
+        """Stream CSV rows straight to a file"""
+        with open(path, "w", newline="", buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADER)
+            writer.writerows(rows)
+
+    def _count_findings(self, findings: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+        """Tally findings by status and severity in a single pass"""
+        status_totals = [0, 0, 0]
+        severity_totals = [0, 0, 0]
+        for f in findings:
+            idx = STATUS_IDX.get(f["status"])
+            if idx is not None:
+                status_totals[idx] += 1
+            idx = SEVERITY_IDX.get(f["severity"])
+            if idx is not None:
+                severity_totals[idx] += 1
+        return status_totals, severity_totals
+
+    async def _prepare_report_data(self, scan_data: Dict[str, Any],
+                                   counts: Optional[Tuple[List[int], List[int]]] = None) -> Dict[str, Any]:
         """Prepare and enrich report data"""
         findings = scan_data["findings"]
-        
+        status_totals, severity_totals = counts or self._count_findings(findings)
+
         # Calculate statistics
         stats = {
             "total_checks": len(findings),
-            "failed": len([f for f in findings if f["status"] == "failed"]),
-            "passed": len([f for f in findings if f["status"] == "passed"]),
-            "errors": len([f for f in findings if f["status"] == "error"]),
+            "failed": status_totals[STATUS_IDX["failed"]],
+            "passed": status_totals[STATUS_IDX["passed"]],
+            "errors": status_totals[STATUS_IDX["error"]],
             "compliance_score": 0.0
         }
         
@@ -108,11 +168,7 @@ class ReportGenerator:
             stats["compliance_score"] = (stats["passed"] / stats["total_checks"]) * 100
 
         # Group findings by severity
-        severity_counts = {
-            "high": len([f for f in findings if f["severity"] == "high"]),
-            "medium": len([f for f in findings if f["severity"] == "medium"]),
-            "low": len([f for f in findings if f["severity"] == "low"])
-        }
+        severity_counts = dict(zip(SEVERITY_IDX, severity_totals))
 
         return {
             "scan_info": {
@@ -125,44 +181,46 @@ class ReportGenerator:
             "severity_counts": severity_counts
         }
 
-    async def _generate_charts(self, report_data: Dict[str, Any]) -> Dict[str, str]:
+    async def _generate_charts(self, counts: Tuple[List[int], List[int]]) -> Dict[str, str]:
         """Generate charts for the report"""
+        # Rendering is blocking, so keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._render_charts, *counts)
+
+    def _render_charts(self, status_totals: List[int], severity_totals: List[int]) -> Dict[str, str]:
+        """Render report charts to temporary PNG files"""
         charts = {}
         
         # Create compliance pie chart
-        plt.figure(figsize=(8, 8))
+        fig = Figure(figsize=(8, 8))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
         labels = ['Compliant', 'Non-Compliant', 'Errors']
-        sizes = [
-            report_data["statistics"]["passed"],
-            report_data["statistics"]["failed"],
-            report_data["statistics"]["errors"]
-        ]
         colors = ['#2ecc71', '#e74c3c', '#95a5a6']
         
-        plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%')
-        plt.title('Compliance Status')
+        ax.pie(status_totals, labels=labels, colors=colors, autopct='%1.1f%%')
+        ax.set_title('Compliance Status')
         
         # Save to temporary file
         compliance_chart_path = f"/tmp/compliance_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        plt.savefig(compliance_chart_path)
-        plt.close()
+        fig.savefig(compliance_chart_path)
         
         charts["compliance_chart"] = compliance_chart_path
 
         # Create severity bar chart
-        plt.figure(figsize=(10, 6))
-        severity_data = report_data["severity_counts"]
-        
-        x = np.arange(len(severity_data))
-        plt.bar(x, severity_data.values(), color=['#e74c3c', '#f39c12', '#3498db'])
-        plt.xticks(x, severity_data.keys())
-        plt.title('Findings by Severity')
-        plt.ylabel('Number of Findings')
+        fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        x = np.arange(len(severity_totals))
+        ax.bar(x, severity_totals, color=['#e74c3c', '#f39c12', '#3498db'])
+        ax.set_xticks(x)
+        ax.set_xticklabels(SEVERITY_IDX.keys())
+        ax.set_title('Findings by Severity')
+        ax.set_ylabel('Number of Findings')
         
         # Save to temporary file
         severity_chart_path = f"/tmp/severity_chart_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        plt.savefig(severity_chart_path)
-        plt.close()
+        fig.savefig(severity_chart_path)
         
         charts["severity_chart"] = severity_chart_path
 
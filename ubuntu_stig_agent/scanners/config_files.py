@@ -0,0 +1,13 @@
+import os
+from functools import lru_cache
+
+@lru_cache(maxsize=32)
+def _read_config(path: str, mtime_ns: int, size: int) -> str:
+    """Read and decode a file; cached for as long as its mtime and size are unchanged"""
+    with open(path, "rb") as f:
+        return f.read().decode(errors="replace")
+
+def read_config(path: str) -> str:
+    """Read a configuration file, sharing the result across scanners until it changes"""
+    st = os.stat(path)
+    return _read_config(path, st.st_mtime_ns, st.st_size)
\ No newline at end of file
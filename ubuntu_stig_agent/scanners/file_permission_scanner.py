@@ -1,10 +1,86 @@
+import asyncio
+import ctypes
+import errno
 import os
 import stat
 import pwd
 import grp
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NamedTuple
 import logging
 from pathlib import Path
+from types import MappingProxyType
+
+# Interactive accounts start here; lower uids are system accounts
+MIN_USER_UID = 1000
+NO_HOME_DIRS = frozenset(("", "/", "/nonexistent", "/dev/null"))
+
+# Fixed fields of each finding type; checks only fill in title, description and fix
+_MISSING_FILE = MappingProxyType({"rule_id": "V-72011", "status": "failed", "severity": "high", "check_type": "file_permission"})
+_FILE_MODE = MappingProxyType({"rule_id": "V-72013", "status": "failed", "severity": "high", "check_type": "file_permission"})
+_FILE_OWNER = MappingProxyType({"rule_id": "V-72015", "status": "failed", "severity": "high", "check_type": "file_permission"})
+_WORLD_WRITABLE = MappingProxyType({"rule_id": "V-72017", "status": "failed", "severity": "medium", "check_type": "file_permission"})
+_HOME_MODE = MappingProxyType({"rule_id": "V-72019", "status": "failed", "severity": "medium", "check_type": "file_permission"})
+_HOME_OWNER = MappingProxyType({"rule_id": "V-72021", "status": "failed", "severity": "medium", "check_type": "file_permission"})
+_CHECK_ERROR = MappingProxyType({"rule_id": "CHECK-ERROR", "status": "error", "severity": "info", "check_type": "file_permission"})
+
+AT_FDCWD = -100
+AT_STATX_DONT_SYNC = 0x4000
+STATX_TYPE = 0x0001
+STATX_MODE = 0x0002
+STATX_UID = 0x0008
+STATX_GID = 0x0010
+STATX_OWNERSHIP = STATX_TYPE | STATX_MODE | STATX_UID | STATX_GID
+# Errors meaning statx itself is unusable here, rather than a problem with the path
+STATX_UNAVAILABLE = frozenset((errno.ENOSYS, errno.EPERM))
+
+class _Statx(ctypes.Structure):
+    """Leading fields of struct statx, padded to the full 256-byte size"""
+    _fields_ = [
+        ("stx_mask", ctypes.c_uint32),
+        ("stx_blksize", ctypes.c_uint32),
+        ("stx_attributes", ctypes.c_uint64),
+        ("stx_nlink", ctypes.c_uint32),
+        ("stx_uid", ctypes.c_uint32),
+        ("stx_gid", ctypes.c_uint32),
+        ("stx_mode", ctypes.c_uint16),
+        ("__spare0", ctypes.c_uint16),
+        ("__rest", ctypes.c_uint64 * 28),
+    ]
+
+class FileOwnership(NamedTuple):
+    mode: int
+    uid: int
+    gid: int
+
+def _load_statx():
+    """Look up glibc's statx wrapper once; None if libc predates it"""
+    try:
+        func = ctypes.CDLL("libc.so.6", use_errno=True).statx
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.POINTER(_Statx))
+    func.restype = ctypes.c_int
+    return func
+
+_statx = _load_statx()
+
+def _statx_fast(path: str) -> FileOwnership:
+    """Fetch only mode, uid and gid for path, without forcing a sync on remote filesystems"""
+    global _statx
+    if _statx is not None:
+        buf = _Statx()
+        if _statx(AT_FDCWD, os.fsencode(path), AT_STATX_DONT_SYNC, STATX_OWNERSHIP, ctypes.byref(buf)) == 0:
+            if buf.stx_mask & STATX_OWNERSHIP == STATX_OWNERSHIP:
+                return FileOwnership(buf.stx_mode, buf.stx_uid, buf.stx_gid)
+        else:
+            err = ctypes.get_errno()
+            if err not in STATX_UNAVAILABLE:
+                raise OSError(err, os.strerror(err), path)
+            # Kernel older than 4.11, or statx blocked by a seccomp filter; stop trying
+            _statx = None
+
+    st = os.stat(path)
+    return FileOwnership(st.st_mode, st.st_uid, st.st_gid)
 
 class FilePermissionScanner:
     """Scanner for checking file permissions against STIG requirements"""
@@ -29,18 +105,67 @@ class FilePermissionScanner:
             "/var/log"
         ]
 
+        # Account database and uid/gid -> name, refreshed at the start of each scan
+        self._passwd: List[pwd.struct_passwd] = []
+        self._user_names: Dict[int, str] = {}
+        self._group_names: Dict[int, str] = {}
+
+    def _load_name_maps(self):
+        """Resolve all user and group names with one NSS enumeration each"""
+        self._passwd = pwd.getpwall()
+        # Reversed so the first entry wins for shared ids, as getpwuid/getgrgid do
+        self._user_names = {p.pw_uid: p.pw_name for p in reversed(self._passwd)}
+        self._group_names = {g.gr_gid: g.gr_name for g in reversed(grp.getgrall())}
+
+    def _uid_name(self, uid: int) -> str:
+        """Get the user name for a uid, asking NSS only on a miss"""
+        name = self._user_names.get(uid)
+        if name is None:
+            name = self._user_names[uid] = pwd.getpwuid(uid).pw_name
+        return name
+
+    def _gid_name(self, gid: int) -> str:
+        """Get the group name for a gid, asking NSS only on a miss"""
+        name = self._group_names.get(gid)
+        if name is None:
+            name = self._group_names[gid] = grp.getgrgid(gid).gr_name
+        return name
+
+    def _scan_dir(self, path: str) -> List[os.DirEntry]:
+        """List a directory's entries, skipping symlinks; empty if it cannot be read"""
+        try:
+            with os.scandir(path) as it:
+                # Symlinks always carry mode 0777; their targets are checked on their own
+                return [entry for entry in it if not entry.is_symlink()]
+        except OSError as e:
+            self.logger.debug(f"Error scanning {path}: {str(e)}")
+            return []
+
+    def _stat_one(self, entry: os.DirEntry):
+        """Stat a directory entry without following symlinks, returning None if it cannot be read"""
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError:
+            # Typically removed or unreadable while walking; counted by the caller
+            return None
+
     async def scan(self) -> List[Dict[str, Any]]:
         """Run file permission checks"""
         findings = []
+        self._load_name_maps()
         
-        # Check critical file permissions
-        findings.extend(await self._check_critical_files())
-        
-        # Check world-writable files
-        findings.extend(await self._check_world_writable_files())
-        
-        # Check home directory permissions
-        findings.extend(await self._check_home_directories())
+        # Critical files, world-writable files and home directories are independent
+        results = await asyncio.gather(
+            self._check_critical_files(),
+            self._check_world_writable_files(),
+            self._check_home_directories(),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"Error running file permission check: {str(result)}")
+                continue
+            findings.extend(result)
         
         return findings
 
@@ -52,93 +177,93 @@ class FilePermissionScanner:
             try:
                 if not os.path.exists(filepath):
                     findings.append({
-                        "rule_id": "V-72011",
+                        **_MISSING_FILE,
                         "title": f"Missing Critical File: {filepath}",
-                        "status": "failed",
-                        "severity": "high",
                         "description": f"Critical system file {filepath} is missing",
-                        "fix": f"Restore {filepath} from system backup or reinstall package",
-                        "check_type": "file_permission"
+                        "fix": f"Restore {filepath} from system backup or reinstall package"
                     })
                     continue
 
-                stat_info = os.stat(filepath)
-                current_mode = stat.S_IMODE(stat_info.st_mode)
-                current_owner = pwd.getpwuid(stat_info.st_uid).pw_name
-                current_group = grp.getgrgid(stat_info.st_gid).gr_name
+                stat_info = _statx_fast(filepath)
+                current_mode = stat.S_IMODE(stat_info.mode)
+                current_owner = self._uid_name(stat_info.uid)
+                current_group = self._gid_name(stat_info.gid)
 
                 if current_mode != required["mode"]:
                     findings.append({
-                        "rule_id": "V-72013",
+                        **_FILE_MODE,
                         "title": f"Incorrect File Permissions: {filepath}",
-                        "status": "failed",
-                        "severity": "high",
                         "description": f"File {filepath} has incorrect permissions: {oct(current_mode)} (should be {oct(required['mode'])})",
-                        "fix": f"chmod {oct(required['mode'])[2:]} {filepath}",
-                        "check_type": "file_permission"
+                        "fix": f"chmod {oct(required['mode'])[2:]} {filepath}"
                     })
 
                 if current_owner != required["owner"] or current_group != required["group"]:
                     findings.append({
-                        "rule_id": "V-72015",
+                        **_FILE_OWNER,
                         "title": f"Incorrect File Ownership: {filepath}",
-                        "status": "failed",
-                        "severity": "high",
                         "description": f"File {filepath} has incorrect ownership: {current_owner}:{current_group} (should be {required['owner']}:{required['group']})",
-                        "fix": f"chown {required['owner']}:{required['group']} {filepath}",
-                        "check_type": "file_permission"
+                        "fix": f"chown {required['owner']}:{required['group']} {filepath}"
                     })
 
             except Exception as e:
                 self.logger.error(f"Error checking {filepath}: {str(e)}")
                 findings.append({
-                    "rule_id": "CHECK-ERROR",
+                    **_CHECK_ERROR,
                     "title": f"File Permission Check Error: {filepath}",
-                    "status": "error",
-                    "severity": "info",
                     "description": f"Error checking file permissions: {str(e)}",
-                    "fix": "Ensure proper permissions to read file attributes",
-                    "check_type": "file_permission"
+                    "fix": "Ensure proper permissions to read file attributes"
                 })
 
         return findings
 
     async def _check_world_writable_files(self) -> List[Dict[str, Any]]:
         """Check for unauthorized world-writable files"""
+        # The walks are blocking syscall work, so run them off the event loop, one per directory
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(None, self._walk_world_writable, directory)
+            for directory in self.check_world_writable
+        ))
+        return [finding for result in results for finding in result]
+
+    def _walk_world_writable(self, directory: str) -> List[Dict[str, Any]]:
+        """Walk a directory tree and report world-writable entries"""
         findings = []
+        sticky_allowed = directory in ["/tmp", "/var/tmp"]
+        failed = 0
         
-        for directory in self.check_world_writable:
-            try:
-                for root, dirs, files in os.walk(directory):
-                    for name in files + dirs:
-                        filepath = os.path.join(root, name)
-                        try:
-                            stat_info = os.stat(filepath)
-                            mode = stat.S_IMODE(stat_info.st_mode)
-                            
-                            # Check if world-writable
-                            if mode & stat.S_IWOTH:
-                                # Skip if sticky bit is set for allowed directories
-                                if directory in ["/tmp", "/var/tmp"] and \
-                                   os.path.isdir(filepath) and \
-                                   mode & stat.S_ISVTX:
-                                    continue
-                                    
-                                findings.append({
-                                    "rule_id": "V-72017",
-                                    "title": f"World-Writable File: {filepath}",
-                                    "status": "failed",
-                                    "severity": "medium",
-                                    "description": f"File {filepath} is world-writable (mode: {oct(mode)})",
-                                    "fix": f"chmod o-w {filepath}",
-                                    "check_type": "file_permission"
-                                })
-                                
-                        except Exception as e:
-                            self.logger.debug(f"Error checking {filepath}: {str(e)}")
+        try:
+            stack = [directory]
+            while stack:
+                current = stack.pop()
+                # Only sticky directories directly under /tmp or /var/tmp are exempt
+                exempt_sticky = sticky_allowed and current == directory
+                for entry in self._scan_dir(current):
+                    st = self._stat_one(entry)
+                    if st is None:
+                        failed += 1
+                        continue
+                    mode = st.st_mode
+                    is_dir = stat.S_ISDIR(mode)
+                    if mode & stat.S_IWOTH:
+                        # Sticky shared directories are allowed; don't descend into them either
+                        if exempt_sticky and is_dir and mode & stat.S_ISVTX:
+                            continue
+                        filepath = entry.path
+                        findings.append({
+                            **_WORLD_WRITABLE,
+                            "title": f"World-Writable File: {filepath}",
+                            "description": f"File {filepath} is world-writable (mode: {oct(stat.S_IMODE(mode))})",
+                            "fix": f"chmod o-w {filepath}"
+                        })
+                    if is_dir:
+                        stack.append(entry.path)
 
-            except Exception as e:
-                self.logger.error(f"Error scanning directory {directory}: {str(e)}")
+        except OSError as e:
+            self.logger.error(f"Error scanning directory {directory}: {str(e)}")
+
+        if failed:
+            self.logger.debug(f"Could not stat {failed} entries under {directory}")
 
         return findings
 
@@ -147,60 +272,45 @@ class FilePermissionScanner:
         findings = []
         
         try:
-            with open('/etc/passwd', 'r') as f:
-                for line in f:
-                    if not line.strip() or line.startswith('#'):
-                        continue
-                        
-                    fields = line.strip().split(':')
-                    if len(fields) >= 6:
-                        username = fields[0]
-                        home_dir = fields[5]
+            for pw in self._passwd or pwd.getpwall():
+                username, home_dir = pw.pw_name, pw.pw_dir
+                if pw.pw_uid < MIN_USER_UID or home_dir in NO_HOME_DIRS:
+                    continue
+
+                try:
+                    if os.path.exists(home_dir):
+                        stat_info = _statx_fast(home_dir)
+                        mode = stat.S_IMODE(stat_info.mode)
                         
-                        if home_dir and home_dir != '/':
-                            try:
-                                if os.path.exists(home_dir):
-                                    stat_info = os.stat(home_dir)
-                                    mode = stat.S_IMODE(stat_info.st_mode)
-                                    
-                                    # Check if home directory is world-readable or world-writable
-                                    if mode & (stat.S_IROTH | stat.S_IWOTH):
-                                        findings.append({
-                                            "rule_id": "V-72019",
-                                            "title": f"Insecure Home Directory: {home_dir}",
-                                            "status": "failed",
-                                            "severity": "medium",
-                                            "description": f"Home directory {home_dir} for user {username} has incorrect permissions: {oct(mode)}",
-                                            "fix": f"chmod o-rw {home_dir}",
-                                            "check_type": "file_permission"
-                                        })
-                                        
-                                    # Check ownership
-                                    owner = pwd.getpwuid(stat_info.st_uid).pw_name
-                                    if owner != username and owner != "root":
-                                        findings.append({
-                                            "rule_id": "V-72021",
-                                            "title": f"Incorrect Home Directory Ownership: {home_dir}",
-                                            "status": "failed",
-                                            "severity": "medium",
-                                            "description": f"Home directory {home_dir} is owned by {owner} instead of {username}",
-                                            "fix": f"chown {username} {home_dir}",
-                                            "check_type": "file_permission"
-                                        })
-                                        
-                            except Exception as e:
-                                self.logger.debug(f"Error checking home directory {home_dir}: {str(e)}")
+                        # Check if home directory is world-readable or world-writable
+                        if mode & (stat.S_IROTH | stat.S_IWOTH):
+                            findings.append({
+                                **_HOME_MODE,
+                                "title": f"Insecure Home Directory: {home_dir}",
+                                "description": f"Home directory {home_dir} for user {username} has incorrect permissions: {oct(mode)}",
+                                "fix": f"chmod o-rw {home_dir}"
+                            })
+                            
+                        # Check ownership
+                        owner = self._uid_name(stat_info.uid)
+                        if owner != username and owner != "root":
+                            findings.append({
+                                **_HOME_OWNER,
+                                "title": f"Incorrect Home Directory Ownership: {home_dir}",
+                                "description": f"Home directory {home_dir} is owned by {owner} instead of {username}",
+                                "fix": f"chown {username} {home_dir}"
+                            })
+                            
+                except (OSError, KeyError) as e:
+                    self.logger.debug(f"Error checking home directory {home_dir}: {str(e)}")
                                 
         except Exception as e:
-            self.logger.error(f"Error reading passwd file: {str(e)}")
+            self.logger.error(f"Error reading user accounts: {str(e)}")
             findings.append({
-                "rule_id": "CHECK-ERROR",
+                **_CHECK_ERROR,
                 "title": "Home Directory Check Error",
-                "status": "error",
-                "severity": "info",
                 "description": f"Error checking home directories: {str(e)}",
-                "fix": "Ensure proper permissions to read passwd file",
-                "check_type": "file_permission"
+                "fix": "Ensure proper permissions to read the user account database"
             })
 
-        return findings 
\ No newline at end of file
+        return findings
\ No newline at end of file
@@ -1,23 +1,38 @@
 import asyncio
 import subprocess
 from typing import List, Dict, Any
+import logging
 import os
+import re
+from .config_files import read_config
+
+# Active (uncommented) directives only; sshd keywords are case-insensitive
+SSHD_DIRECTIVE_RE = re.compile(r"(?mi)^\s*(Protocol|PermitRootLogin|PermitEmptyPasswords|X11Forwarding)\s+(\S+)")
+PWQUALITY_RE = re.compile(r"(?m)^[^#\n]*\bpam_pwquality\.so\b")
+CORE_LIMIT_RE = re.compile(r"(?m)^\s*\*\s+hard\s+core\s+0\s*$")
 
 class SecurityConfigScanner:
     """Scanner for system security configurations"""
     
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
     async def scan(self) -> List[Dict[str, Any]]:
         """Run security configuration checks"""
         findings = []
         
-        # Check password policies
-        findings.extend(await self._check_password_policy())
-        
-        # Check SSH configuration
-        findings.extend(await self._check_ssh_config())
-        
-        # Check system-wide security settings
-        findings.extend(await self._check_system_security())
+        # Password policy, SSH and system-wide settings are independent
+        results = await asyncio.gather(
+            self._check_password_policy(),
+            self._check_ssh_config(),
+            self._check_system_security(),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"Error running security configuration check: {str(result)}")
+                continue
+            findings.extend(result)
         
         return findings
 
@@ -27,11 +42,10 @@ class SecurityConfigScanner:
         
         # Read PAM configuration
         try:
-            with open('/etc/pam.d/common-password', 'r') as f:
-                pam_config = f.read()
+            pam_config = read_config('/etc/pam.d/common-password')
 
             # Check password complexity
-            if 'pam_pwquality.so' not in pam_config:
+            if not PWQUALITY_RE.search(pam_config):
                 findings.append({
                     'severity': 'high',
                     'rule_id': 'V-72427',
@@ -60,11 +74,15 @@ class SecurityConfigScanner:
         findings = []
         
         try:
-            with open('/etc/ssh/sshd_config', 'r') as f:
-                ssh_config = f.read()
+            ssh_config = read_config('/etc/ssh/sshd_config')
+
+            # sshd honours the first occurrence of each directive
+            settings = {}
+            for match in SSHD_DIRECTIVE_RE.finditer(ssh_config):
+                settings.setdefault(match.group(1).lower(), match.group(2))
 
             # Check Protocol version
-            if 'Protocol 2' not in ssh_config:
+            if settings.get('protocol') != '2':
                 findings.append({
                     'severity': 'high',
                     'rule_id': 'V-72433',
@@ -76,7 +94,7 @@ class SecurityConfigScanner:
                 })
 
             # Check PermitRootLogin
-            if 'PermitRootLogin yes' in ssh_config:
+            if settings.get('permitrootlogin', '').lower() == 'yes':
                 findings.append({
                     'severity': 'high',
                     'rule_id': 'V-72435',
@@ -106,10 +124,9 @@ class SecurityConfigScanner:
         
         # Check core dumps
         try:
-            with open('/etc/security/limits.conf', 'r') as f:
-                limits_config = f.read()
+            limits_config = read_config('/etc/security/limits.conf')
 
-            if '*     hard    core    0' not in limits_config:
+            if not CORE_LIMIT_RE.search(limits_config):
                 findings.append({
                     'severity': 'medium',
                     'rule_id': 'V-72439',
@@ -1,10 +1,25 @@
 import asyncio
 import subprocess
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set
 import logging
 import os
 import re
 from pathlib import Path
+from .config_files import read_config
+
+# default.target symlinks in lookup order: admin override, then distribution default
+DEFAULT_TARGET_LINKS = (
+    "/etc/systemd/system/default.target",
+    "/lib/systemd/system/default.target",
+)
+
+# Socket tables and the hex state code of a listening socket in each (TCP_LISTEN, UDP unconnected)
+PROC_NET_TABLES = (
+    ("/proc/net/tcp", b"0A"),
+    ("/proc/net/tcp6", b"0A"),
+    ("/proc/net/udp", b"07"),
+    ("/proc/net/udp6", b"07"),
+)
 
 class ServiceScanner:
     """Scanner for checking service configurations against STIG requirements"""
@@ -57,87 +72,117 @@ class ServiceScanner:
             }
         }
 
+        # One pattern per config file matching all of its settings in a single pass;
+        # accepts both "Key value" (sshd) and "key = value" (auditd) lines
+        self._config_patterns = {
+            service: re.compile(
+                r"^\s*(" + "|".join(map(re.escape, config["settings"])) + r")(?:\s*=\s*|\s+)(.+?)\s*$",
+                re.MULTILINE
+            )
+            for service, config in self.service_configs.items()
+        }
+
+        # Snapshot of unit states taken once per scan by _load_service_states
+        self._service_states: Optional[Dict[str, Dict[str, Any]]] = None
+
     async def scan(self) -> List[Dict[str, Any]]:
         """Run service configuration checks"""
         findings = []
         
-        # Check service states
-        findings.extend(await self._check_service_states())
-        
-        # Check service configurations
-        findings.extend(await self._check_service_configs())
-        
-        # Check for unauthorized services
-        findings.extend(await self._check_unauthorized_services())
-        
-        # Check systemd targets
-        findings.extend(await self._check_systemd_targets())
+        # Service states, configurations, listening ports and targets are independent
+        results = await asyncio.gather(
+            self._check_service_states(),
+            self._check_service_configs(),
+            self._check_unauthorized_services(),
+            self._check_systemd_targets(),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error(f"Error running service check: {str(result)}")
+                continue
+            findings.extend(result)
         
         return findings
 
     async def _check_service_states(self) -> List[Dict[str, Any]]:
         """Check if required services are running and disabled services are stopped"""
         findings = []
+        self._service_states = await self._load_service_states()
+
+        # Prohibited services that are not installed need no further checks
+        disabled_services = self.disabled_services
+        if self._service_states is not None:
+            disabled_services = [s for s in disabled_services if self._service_states[s]["installed"]]
+        else:
+            installed = await self._list_unit_files()
+            if installed is not None:
+                disabled_services = [s for s in disabled_services if f"{s}.service" in installed]
         
+        # Look up every service concurrently
+        statuses = await asyncio.gather(
+            *(self._get_service_status(service)
+              for service in self.required_services + disabled_services),
+            return_exceptions=True
+        )
+        required_statuses = statuses[:len(self.required_services)]
+        disabled_statuses = statuses[len(self.required_services):]
+
         # Check required services
-        for service in self.required_services:
-            try:
-                status = await self._get_service_status(service)
-                
-                if status["active"] != "active":
-                    findings.append({
-                        "rule_id": "V-72051",
-                        "title": f"Required Service Not Running: {service}",
-                        "status": "failed",
-                        "severity": "high",
-                        "description": f"Required service {service} is not running",
-                        "fix": f"systemctl start {service} && systemctl enable {service}",
-                        "check_type": "service"
-                    })
-                
-                if not status["enabled"]:
-                    findings.append({
-                        "rule_id": "V-72053",
-                        "title": f"Required Service Not Enabled: {service}",
-                        "status": "failed",
-                        "severity": "medium",
-                        "description": f"Required service {service} is not enabled",
-                        "fix": f"systemctl enable {service}",
-                        "check_type": "service"
-                    })
-                    
-            except Exception as e:
-                self.logger.error(f"Error checking service {service}: {str(e)}")
+        for service, status in zip(self.required_services, required_statuses):
+            if isinstance(status, Exception):
+                self.logger.error(f"Error checking service {service}: {str(status)}")
+                continue
+
+            if status["active"] != "active":
+                findings.append({
+                    "rule_id": "V-72051",
+                    "title": f"Required Service Not Running: {service}",
+                    "status": "failed",
+                    "severity": "high",
+                    "description": f"Required service {service} is not running",
+                    "fix": f"systemctl start {service} && systemctl enable {service}",
+                    "check_type": "service"
+                })
+            
+            if not status["enabled"]:
+                findings.append({
+                    "rule_id": "V-72053",
+                    "title": f"Required Service Not Enabled: {service}",
+                    "status": "failed",
+                    "severity": "medium",
+                    "description": f"Required service {service} is not enabled",
+                    "fix": f"systemctl enable {service}",
+                    "check_type": "service"
+                })
                 
         # Check disabled services
-        for service in self.disabled_services:
-            try:
-                status = await self._get_service_status(service)
-                
-                if status["active"] == "active":
-                    findings.append({
-                        "rule_id": "V-72055",
-                        "title": f"Prohibited Service Running: {service}",
-                        "status": "failed",
-                        "severity": "high",
-                        "description": f"Prohibited service {service} is running",
-                        "fix": f"systemctl stop {service} && systemctl disable {service}",
-                        "check_type": "service"
-                    })
-                
-                if status["enabled"]:
-                    findings.append({
-                        "rule_id": "V-72057",
-                        "title": f"Prohibited Service Enabled: {service}",
-                        "status": "failed",
-                        "severity": "medium",
-                        "description": f"Prohibited service {service} is enabled",
-                        "fix": f"systemctl disable {service}",
-                        "check_type": "service"
-                    })
-                    
-            except Exception as e:
-                self.logger.debug(f"Error checking service {service}: {str(e)}")
+        for service, status in zip(disabled_services, disabled_statuses):
+            if isinstance(status, Exception):
+                self.logger.debug(f"Error checking service {service}: {str(status)}")
+                continue
+
+            if status["active"] == "active":
+                findings.append({
+                    "rule_id": "V-72055",
+                    "title": f"Prohibited Service Running: {service}",
+                    "status": "failed",
+                    "severity": "high",
+                    "description": f"Prohibited service {service} is running",
+                    "fix": f"systemctl stop {service} && systemctl disable {service}",
+                    "check_type": "service"
+                })
+            
+            if status["enabled"]:
+                findings.append({
+                    "rule_id": "V-72057",
+                    "title": f"Prohibited Service Enabled: {service}",
+                    "status": "failed",
+                    "severity": "medium",
+                    "description": f"Prohibited service {service} is enabled",
+                    "fix": f"systemctl disable {service}",
+                    "check_type": "service"
+                })
 
         return findings
 
@@ -161,15 +206,15 @@ class ServiceScanner:
                 continue
                 
             try:
-                with open(config_path, 'r') as f:
-                    content = f.read()
+                content = read_config(config_path)
                     
+                # Collect the first value of every tracked setting in one pass
+                found = {}
+                for match in self._config_patterns[service].finditer(content):
+                    found.setdefault(match.group(1), match.group(2))
+
                 for setting, required_value in config["settings"].items():
-                    # Look for the setting in the config file
-                    pattern = rf"^\s*{setting}\s+(.+?)\s*$"
-                    match = re.search(pattern, content, re.MULTILINE)
-                    
-                    if not match or match.group(1) != required_value:
+                    if found.get(setting) != required_value:
                         findings.append({
                             "rule_id": "V-72061",
                             "title": f"Incorrect Service Configuration: {service}",
@@ -200,40 +245,32 @@ class ServiceScanner:
         
         try:
             # Check listening ports
-            process = await asyncio.create_subprocess_exec(
-                "ss", "-tuln",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode == 0:
-                output = stdout.decode()
-                
-                # Check for telnet port
-                if ":23" in output:
-                    findings.append({
-                        "rule_id": "V-72063",
-                        "title": "Telnet Port Open",
-                        "status": "failed",
-                        "severity": "high",
-                        "description": "Telnet port (23) is open",
-                        "fix": "Identify and disable service listening on port 23",
-                        "check_type": "service"
-                    })
-                
-                # Check for FTP port
-                if ":21" in output:
-                    findings.append({
-                        "rule_id": "V-72065",
-                        "title": "FTP Port Open",
-                        "status": "failed",
-                        "severity": "high",
-                        "description": "FTP port (21) is open",
-                        "fix": "Identify and disable service listening on port 21",
-                        "check_type": "service"
-                    })
-                    
+            listening = self._get_listening_ports()
+
+            # Check for telnet port
+            if 23 in listening:
+                findings.append({
+                    "rule_id": "V-72063",
+                    "title": "Telnet Port Open",
+                    "status": "failed",
+                    "severity": "high",
+                    "description": "Telnet port (23) is open",
+                    "fix": "Identify and disable service listening on port 23",
+                    "check_type": "service"
+                })
+
+            # Check for FTP port
+            if 21 in listening:
+                findings.append({
+                    "rule_id": "V-72065",
+                    "title": "FTP Port Open",
+                    "status": "failed",
+                    "severity": "high",
+                    "description": "FTP port (21) is open",
+                    "fix": "Identify and disable service listening on port 21",
+                    "check_type": "service"
+                })
+
         except Exception as e:
             self.logger.error(f"Error checking network services: {str(e)}")
             findings.append({
@@ -254,28 +291,20 @@ class ServiceScanner:
         
         try:
             # Check default target
-            process = await asyncio.create_subprocess_exec(
-                "systemctl", "get-default",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
+            default_target = await self._get_default_target()
             
-            if process.returncode == 0:
-                default_target = stdout.decode().strip()
+            # Check if graphical target is default
+            if default_target == "graphical.target":
+                findings.append({
+                    "rule_id": "V-72067",
+                    "title": "Graphical Target Default",
+                    "status": "failed",
+                    "severity": "medium",
+                    "description": "System is configured to boot to graphical target",
+                    "fix": "systemctl set-default multi-user.target",
+                    "check_type": "service"
+                })
                 
-                # Check if graphical target is default
-                if default_target == "graphical.target":
-                    findings.append({
-                        "rule_id": "V-72067",
-                        "title": "Graphical Target Default",
-                        "status": "failed",
-                        "severity": "medium",
-                        "description": "System is configured to boot to graphical target",
-                        "fix": "systemctl set-default multi-user.target",
-                        "check_type": "service"
-                    })
-                    
         except Exception as e:
             self.logger.error(f"Error checking systemd targets: {str(e)}")
             findings.append({
@@ -290,33 +319,118 @@ class ServiceScanner:
 
         return findings
 
-    async def _get_service_status(self, service: str) -> Dict[str, Any]:
-        """Get service status using systemctl"""
-        status = {
-            "active": "unknown",
-            "enabled": False
-        }
-        
+    async def _get_default_target(self) -> Optional[str]:
+        """Resolve the default boot target from its symlink, asking systemctl only as a fallback"""
+        for link in DEFAULT_TARGET_LINKS:
+            try:
+                return os.path.basename(os.readlink(link))
+            except OSError:
+                continue
+
+        process = await asyncio.create_subprocess_exec(
+            "systemctl", "get-default",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            return None
+        return stdout.decode().strip()
+
+    def _get_listening_ports(self) -> Set[int]:
+        """Read local ports of listening TCP and bound UDP sockets straight from /proc"""
+        ports = set()
+        for path, listen_state in PROC_NET_TABLES:
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                # IPv6 disabled
+                continue
+            with f:
+                next(f, None)  # header
+                for line in f:
+                    fields = line.split()
+                    if fields[3] == listen_state:
+                        ports.add(int(fields[1].rpartition(b":")[2], 16))
+        return ports
+
+    async def _load_service_states(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Query the state of every tracked service with a single systemctl call"""
+        services = self.required_services + self.disabled_services
         try:
-            # Check if service is active
             process = await asyncio.create_subprocess_exec(
-                "systemctl", "is-active", service,
+                "systemctl", "show", "--property=Id,LoadState,ActiveState,UnitFileState",
+                *(f"{service}.service" for service in services),
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.DEVNULL
             )
             stdout, _ = await process.communicate()
-            status["active"] = stdout.decode().strip()
-            
-            # Check if service is enabled
+        except Exception as e:
+            self.logger.debug(f"Error querying service states: {str(e)}")
+            return None
+
+        # One block of properties per unit, in argument order
+        blocks = [block for block in stdout.decode().split("\n\n") if block.strip()]
+        if process.returncode != 0 or len(blocks) != len(services):
+            return None
+
+        states = {}
+        for service, block in zip(services, blocks):
+            properties = dict(line.partition("=")[::2] for line in block.splitlines())
+            states[service] = {
+                "active": properties.get("ActiveState", "unknown"),
+                "enabled": properties.get("UnitFileState") == "enabled",
+                "installed": properties.get("LoadState") != "not-found"
+            }
+        return states
+
+    async def _list_unit_files(self) -> Optional[Set[str]]:
+        """Get the names of all installed service unit files"""
+        try:
             process = await asyncio.create_subprocess_exec(
-                "systemctl", "is-enabled", service,
+                "systemctl", "list-unit-files", "--type=service", "--no-legend",
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.DEVNULL
             )
             stdout, _ = await process.communicate()
-            status["enabled"] = stdout.decode().strip() == "enabled"
+        except Exception as e:
+            self.logger.debug(f"Error listing unit files: {str(e)}")
+            return None
+
+        if process.returncode != 0:
+            return None
+        return {line.split(None, 1)[0] for line in stdout.decode().splitlines() if line.strip()}
+
+    async def _get_service_status(self, service: str) -> Dict[str, Any]:
+        """Get service status using systemctl"""
+        if self._service_states is not None and service in self._service_states:
+            return self._service_states[service]
+
+        status = {
+            "active": "unknown",
+            "enabled": False
+        }
+        
+        try:
+            # Check if service is active and enabled at the same time
+            active, enabled = await asyncio.gather(
+                self._systemctl_query("is-active", service),
+                self._systemctl_query("is-enabled", service)
+            )
+            status["active"] = active
+            status["enabled"] = enabled == "enabled"
             
         except Exception as e:
             self.logger.error(f"Error getting status for service {service}: {str(e)}")
             
-        return status 
\ No newline at end of file
+        return status 
+
+    async def _systemctl_query(self, command: str, service: str) -> str:
+        """Run a single-word systemctl query such as is-active for a service"""
+        process = await asyncio.create_subprocess_exec(
+            "systemctl", command, service,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+        return stdout.decode().strip()
\ No newline at end of file
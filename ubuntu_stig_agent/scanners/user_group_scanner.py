@@ -1,103 +1,260 @@
+import asyncio
+import mmap
+import os
 import pwd
 import grp
 import spwd
-from typing import List, Dict, Any
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Any, Tuple, Callable, Set, Optional
 import logging
 from datetime import datetime, timedelta
 import re
 
+# An active NOPASSWD tag: one not preceded by a comment marker on its line.
+# "#" followed by a digit is a numeric uid/gid user spec (e.g. "#1000 ALL=..."), not a comment.
+NOPASSWD_RE = re.compile(rb"(?m)^(?:[^#\n]|#(?=\d))*NOPASSWD")
+
+# Login shells accepted for the root account
+VALID_ROOT_SHELLS = frozenset(("/bin/bash", "/bin/sh"))
+
+# Constant parts of each finding; checks merge in the per-hit fields
+_MISSING_USER = MappingProxyType({"rule_id": "V-72031", "status": "failed", "severity": "high", "check_type": "user_group"})
+_MISSING_GROUP = MappingProxyType({"rule_id": "V-72033", "status": "failed", "severity": "high", "check_type": "user_group"})
+_PROHIBITED_USER = MappingProxyType({"rule_id": "V-72035", "status": "failed", "severity": "medium", "check_type": "user_group"})
+_PW_MAX_AGE = MappingProxyType({"rule_id": "V-72037", "status": "failed", "severity": "medium", "check_type": "user_group"})
+_PW_MIN_AGE = MappingProxyType({"rule_id": "V-72039", "status": "failed", "severity": "medium", "check_type": "user_group"})
+_ROOT_UID = MappingProxyType({"rule_id": "V-72041", "status": "failed", "severity": "high", "check_type": "user_group"})
+_ROOT_GID = MappingProxyType({"rule_id": "V-72043", "status": "failed", "severity": "high", "check_type": "user_group"})
+_ROOT_SHELL = MappingProxyType({"rule_id": "V-72045", "status": "failed", "severity": "medium", "check_type": "user_group"})
+_SUDO_MEMBERS = MappingProxyType({"rule_id": "V-72047", "status": "failed", "severity": "medium", "check_type": "user_group"})
+_SUDO_NOPASSWD = MappingProxyType({"rule_id": "V-72049", "status": "failed", "severity": "high", "check_type": "user_group"})
+_CHECK_ERROR = MappingProxyType({"rule_id": "CHECK-ERROR", "status": "error", "severity": "info", "check_type": "user_group"})
+
+# Text of the findings that can fire once per account, as bound str.format callables
+_MISSING_USER_TITLE = "Missing Required User: {}".format
+_MISSING_USER_DESC = "Required user {} does not exist".format
+_MISSING_USER_FIX = "useradd {}".format
+_MISSING_GROUP_TITLE = "Missing Required Group: {}".format
+_MISSING_GROUP_DESC = "Required group {} does not exist".format
+_MISSING_GROUP_FIX = "groupadd {}".format
+_PROHIBITED_USER_TITLE = "Prohibited User Account: {}".format
+_PROHIBITED_USER_DESC = "Prohibited user account {} exists".format
+_PROHIBITED_USER_FIX = "userdel {}".format
+_PW_MAX_AGE_TITLE = "Password Age Violation: {}".format
+_PW_MAX_AGE_DESC = "User {} has maximum password age > {} days".format
+_PW_MAX_AGE_FIX = "chage -M {1} {0}".format
+_PW_MIN_AGE_TITLE = "Minimum Password Age Violation: {}".format
+_PW_MIN_AGE_DESC = "User {} has minimum password age < {} days".format
+_PW_MIN_AGE_FIX = "chage -m {1} {0}".format
+
+# Account databases whose modification invalidates the lookup caches below
+ACCOUNT_FILES = ("/etc/passwd", "/etc/group")
+_cache_stamp: Tuple[int, ...] = ()
+# lru_cache does not remember raised KeyErrors, so absent names are tracked separately
+_missing_users: Set[str] = set()
+_missing_groups: Set[str] = set()
+
+@lru_cache(maxsize=256)
+def _cached_getpwnam(name: str) -> pwd.struct_passwd:
+    """getpwnam, cached across scans until the account files change"""
+    if name in _missing_users:
+        raise KeyError(name)
+    try:
+        return pwd.getpwnam(name)
+    except KeyError:
+        _missing_users.add(name)
+        raise
+
+@lru_cache(maxsize=256)
+def _cached_getgrnam(name: str) -> grp.struct_group:
+    """getgrnam, cached across scans until the account files change"""
+    if name in _missing_groups:
+        raise KeyError(name)
+    try:
+        return grp.getgrnam(name)
+    except KeyError:
+        _missing_groups.add(name)
+        raise
+
+def _resolve(lookup: Callable[[str], Any], names) -> Dict[str, Any]:
+    """Look up each name once, keeping the entries of those that exist"""
+    found = {}
+    for name in names:
+        try:
+            found[name] = lookup(name)
+        except KeyError:
+            pass
+    return found
+
+def _refresh_account_caches():
+    """Drop cached lookups if /etc/passwd or /etc/group changed since they were made"""
+    global _cache_stamp
+    stamp = []
+    for path in ACCOUNT_FILES:
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamp.append(0)
+    stamp = tuple(stamp)
+    if stamp != _cache_stamp:
+        _cached_getpwnam.cache_clear()
+        _cached_getgrnam.cache_clear()
+        _missing_users.clear()
+        _missing_groups.clear()
+        _cache_stamp = stamp
+
+# Parsed file results, reused while the file's (mtime_ns, size) is unchanged
+_file_stamps: Dict[str, Tuple[int, int]] = {}
+_file_results: Dict[str, Any] = {}
+
+def _cached_parse(path: str, parse: Callable[[str], Any]) -> Any:
+    """Return parse(path), re-running it only when the file has changed since the last call"""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    if _file_stamps.get(path) != stamp:
+        _file_results[path] = parse(path)
+        _file_stamps[path] = stamp
+    return _file_results[path]
+
+def _read_shadow(path: str) -> List[Tuple[str, int, int, int]]:
+    """Snapshot the (name, last change, min age, max age) fields of the shadow database"""
+    if os.geteuid() != 0:
+        return [(u.sp_namp, u.sp_lstchg, u.sp_min, u.sp_max) for u in spwd.getspall()]
+
+    # As root the file is readable directly; split the raw bytes instead of building struct_spwd per entry
+    entries = []
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return entries
+        with mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ) as mm:
+            data = mm[:]
+    for line in data.splitlines():
+        fields = line.split(b":", 5)
+        if len(fields) < 5 or line[:1] in (b"+", b"-"):
+            continue  # Blank, malformed or NIS compat entries
+        name, _, lstchg, sp_min, sp_max = fields[:5]
+        # Empty numeric fields mean "not set", which spwd reports as -1
+        entries.append((
+            name.decode(),
+            int(lstchg) if lstchg else -1,
+            int(sp_min) if sp_min else -1,
+            int(sp_max) if sp_max else -1
+        ))
+    return entries
+
+def _scan_sudoers_nopasswd(path: str) -> bool:
+    """Search sudoers for an active NOPASSWD tag, stopping at the first one"""
+    # sudoers is small, so one raw read beats setting up a buffered file or a mapping
+    fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+    try:
+        data = os.read(fd, os.fstat(fd).st_size)
+    finally:
+        os.close(fd)
+    return NOPASSWD_RE.search(data) is not None
+
 class UserGroupScanner:
     """Scanner for checking user and group configurations"""
     
+    # Policy lives on the class, so instances only carry their logger
+    __slots__ = ("logger",)
+    
+    # Users that must exist
+    REQUIRED_USERS = ("root",)
+    
+    # Groups that must exist
+    REQUIRED_GROUPS = ("root", "shadow", "sudo")
+    
+    # Users that should not exist
+    PROHIBITED_USERS = ("games", "irc", "news", "uucp")
+    
+    # Maximum password age in days
+    MAX_PW_AGE = 60
+    
+    # Minimum password age in days
+    MIN_PW_AGE = 1
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
-        
-        # Users that must exist
-        self.required_users = ["root"]
-        
-        # Groups that must exist
-        self.required_groups = ["root", "shadow", "sudo"]
-        
-        # Users that should not exist
-        self.prohibited_users = ["games", "irc", "news", "uucp"]
-        
-        # Maximum password age in days
-        self.max_password_age = 60
-        
-        # Minimum password age in days
-        self.min_password_age = 1
 
     async def scan(self) -> List[Dict[str, Any]]:
         """Run user and group configuration checks"""
         findings = []
+        _refresh_account_caches()
+
+        # One pass over every user the checks ask about, classifying each as it is resolved
+        missing_users, present_prohibited, root_user = self._classify_users()
+        groups = _resolve(_cached_getgrnam, dict.fromkeys(self.REQUIRED_GROUPS + ("sudo",)))
+        missing_groups = [name for name in self.REQUIRED_GROUPS if name not in groups]
         
-        # Check required users and groups
-        findings.extend(await self._check_required_entities())
-        
-        # Check prohibited users
-        findings.extend(await self._check_prohibited_users())
-        
-        # Check password aging
-        findings.extend(await self._check_password_aging())
-        
-        # Check root account
-        findings.extend(await self._check_root_account())
-        
-        # Check sudo group configuration
-        findings.extend(await self._check_sudo_config())
+        # The checks are independent, so overlap their lookups and file reads
+        results = await asyncio.gather(
+            self._check_required_entities(missing_users, missing_groups),
+            self._check_prohibited_users(present_prohibited),
+            self._check_password_aging(),
+            self._check_root_account(root_user),
+            self._check_sudo_config(groups),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                self.logger.error("Error running user and group check: %s", result)
+                continue
+            findings.extend(result)
         
         return findings
 
-    async def _check_required_entities(self) -> List[Dict[str, Any]]:
+    def _classify_users(self) -> Tuple[List[str], List[str], Optional[pwd.struct_passwd]]:
+        """Return the missing required users, the present prohibited users and root's entry"""
+        missing, present_prohibited, root_user = [], [], None
+        # Ordered de-duplication keeps findings in policy order from run to run
+        for name in dict.fromkeys(self.REQUIRED_USERS + self.PROHIBITED_USERS + ("root",)):
+            try:
+                entry = _cached_getpwnam(name)
+            except KeyError:
+                if name in self.REQUIRED_USERS:
+                    missing.append(name)
+                continue
+            if name in self.PROHIBITED_USERS:
+                present_prohibited.append(name)
+            if name == "root":
+                root_user = entry
+        return missing, present_prohibited, root_user
+
+    async def _check_required_entities(self, missing_users: List[str], missing_groups: List[str]) -> List[Dict[str, Any]]:
         """Check for required users and groups"""
         findings = []
         
-        # Check required users
-        existing_users = [user.pw_name for user in pwd.getpwall()]
-        for username in self.required_users:
-            if username not in existing_users:
-                findings.append({
-                    "rule_id": "V-72031",
-                    "title": f"Missing Required User: {username}",
-                    "status": "failed",
-                    "severity": "high",
-                    "description": f"Required user {username} does not exist",
-                    "fix": f"useradd {username}",
-                    "check_type": "user_group"
-                })
+        for username in missing_users:
+            findings.append({
+                **_MISSING_USER,
+                "title": _MISSING_USER_TITLE(username),
+                "description": _MISSING_USER_DESC(username),
+                "fix": _MISSING_USER_FIX(username)
+            })
 
         # Check required groups
-        existing_groups = [group.gr_name for group in grp.getgrall()]
-        for groupname in self.required_groups:
-            if groupname not in existing_groups:
-                findings.append({
-                    "rule_id": "V-72033",
-                    "title": f"Missing Required Group: {groupname}",
-                    "status": "failed",
-                    "severity": "high",
-                    "description": f"Required group {groupname} does not exist",
-                    "fix": f"groupadd {groupname}",
-                    "check_type": "user_group"
-                })
+        for groupname in missing_groups:
+            findings.append({
+                **_MISSING_GROUP,
+                "title": _MISSING_GROUP_TITLE(groupname),
+                "description": _MISSING_GROUP_DESC(groupname),
+                "fix": _MISSING_GROUP_FIX(groupname)
+            })
 
         return findings
 
-    async def _check_prohibited_users(self) -> List[Dict[str, Any]]:
+    async def _check_prohibited_users(self, present_prohibited: List[str]) -> List[Dict[str, Any]]:
         """Check for prohibited user accounts"""
         findings = []
         
-        existing_users = [user.pw_name for user in pwd.getpwall()]
-        for username in self.prohibited_users:
-            if username in existing_users:
-                findings.append({
-                    "rule_id": "V-72035",
-                    "title": f"Prohibited User Account: {username}",
-                    "status": "failed",
-                    "severity": "medium",
-                    "description": f"Prohibited user account {username} exists",
-                    "fix": f"userdel {username}",
-                    "check_type": "user_group"
-                })
+        for username in present_prohibited:
+            findings.append({
+                **_PROHIBITED_USER,
+                "title": _PROHIBITED_USER_TITLE(username),
+                "description": _PROHIBITED_USER_DESC(username),
+                "fix": _PROHIBITED_USER_FIX(username)
+            })
 
         return findings
 
@@ -106,152 +263,136 @@ class UserGroupScanner:
         findings = []
         
         try:
-            for user in spwd.getspall():
-                if user.sp_lstchg == -1:
+            max_age = self.MAX_PW_AGE
+            min_age = self.MIN_PW_AGE
+            # Reading the shadow database blocks, so keep it off the event loop
+            loop = asyncio.get_running_loop()
+            shadow = await loop.run_in_executor(None, _cached_parse, "/etc/shadow", _read_shadow)
+            append = findings.append
+            for name, lstchg, sp_min, sp_max in shadow:
+                if lstchg == -1:
                     continue  # Skip if password aging is disabled
+
+                max_violation = sp_max > max_age or sp_max == -1
+                min_violation = sp_min < min_age
+                if not (max_violation or min_violation):
+                    continue
                     
                 # Check maximum password age
-                if user.sp_max > self.max_password_age or user.sp_max == -1:
-                    findings.append({
-                        "rule_id": "V-72037",
-                        "title": f"Password Age Violation: {user.sp_namp}",
-                        "status": "failed",
-                        "severity": "medium",
-                        "description": f"User {user.sp_namp} has maximum password age > {self.max_password_age} days",
-                        "fix": f"chage -M {self.max_password_age} {user.sp_namp}",
-                        "check_type": "user_group"
+                if max_violation:
+                    append({
+                        **_PW_MAX_AGE,
+                        "title": _PW_MAX_AGE_TITLE(name),
+                        "description": _PW_MAX_AGE_DESC(name, max_age),
+                        "fix": _PW_MAX_AGE_FIX(name, max_age)
                     })
 
                 # Check minimum password age
-                if user.sp_min < self.min_password_age:
-                    findings.append({
-                        "rule_id": "V-72039",
-                        "title": f"Minimum Password Age Violation: {user.sp_namp}",
-                        "status": "failed",
-                        "severity": "medium",
-                        "description": f"User {user.sp_namp} has minimum password age < {self.min_password_age} days",
-                        "fix": f"chage -m {self.min_password_age} {user.sp_namp}",
-                        "check_type": "user_group"
+                if min_violation:
+                    append({
+                        **_PW_MIN_AGE,
+                        "title": _PW_MIN_AGE_TITLE(name),
+                        "description": _PW_MIN_AGE_DESC(name, min_age),
+                        "fix": _PW_MIN_AGE_FIX(name, min_age)
                     })
 
         except Exception as e:
-            self.logger.error(f"Error checking password aging: {str(e)}")
+            self.logger.error("Error checking password aging: %s", e)
             findings.append({
-                "rule_id": "CHECK-ERROR",
+                **_CHECK_ERROR,
                 "title": "Password Aging Check Error",
-                "status": "error",
-                "severity": "info",
                 "description": f"Error checking password aging: {str(e)}",
-                "fix": "Ensure proper permissions to read shadow file",
-                "check_type": "user_group"
+                "fix": "Ensure proper permissions to read shadow file"
             })
 
         return findings
 
-    async def _check_root_account(self) -> List[Dict[str, Any]]:
+    async def _check_root_account(self, root_user: Optional[pwd.struct_passwd]) -> List[Dict[str, Any]]:
         """Check root account configuration"""
         findings = []
         
         try:
-            root_user = pwd.getpwnam("root")
+            if root_user is None:
+                raise KeyError("root account not found")
             
             # Check root UID
             if root_user.pw_uid != 0:
                 findings.append({
-                    "rule_id": "V-72041",
+                    **_ROOT_UID,
                     "title": "Invalid Root UID",
-                    "status": "failed",
-                    "severity": "high",
                     "description": f"Root account has invalid UID: {root_user.pw_uid}",
-                    "fix": "Restore root account UID to 0",
-                    "check_type": "user_group"
+                    "fix": "Restore root account UID to 0"
                 })
 
             # Check root GID
             if root_user.pw_gid != 0:
                 findings.append({
-                    "rule_id": "V-72043",
+                    **_ROOT_GID,
                     "title": "Invalid Root GID",
-                    "status": "failed",
-                    "severity": "high",
                     "description": f"Root account has invalid GID: {root_user.pw_gid}",
-                    "fix": "Restore root account GID to 0",
-                    "check_type": "user_group"
+                    "fix": "Restore root account GID to 0"
                 })
 
             # Check root shell
-            valid_shells = ["/bin/bash", "/bin/sh"]
-            if root_user.pw_shell not in valid_shells:
+            if root_user.pw_shell not in VALID_ROOT_SHELLS:
                 findings.append({
-                    "rule_id": "V-72045",
+                    **_ROOT_SHELL,
                     "title": "Invalid Root Shell",
-                    "status": "failed",
-                    "severity": "medium",
                     "description": f"Root account has invalid shell: {root_user.pw_shell}",
-                    "fix": "chsh -s /bin/bash root",
-                    "check_type": "user_group"
+                    "fix": "chsh -s /bin/bash root"
                 })
 
         except Exception as e:
-            self.logger.error(f"Error checking root account: {str(e)}")
+            self.logger.error("Error checking root account: %s", e)
             findings.append({
-                "rule_id": "CHECK-ERROR",
+                **_CHECK_ERROR,
                 "title": "Root Account Check Error",
-                "status": "error",
-                "severity": "info",
                 "description": f"Error checking root account: {str(e)}",
-                "fix": "Ensure proper permissions to read passwd file",
-                "check_type": "user_group"
+                "fix": "Ensure proper permissions to read passwd file"
             })
 
         return findings
 
-    async def _check_sudo_config(self) -> List[Dict[str, Any]]:
+    async def _check_sudo_config(self, groups: Dict[str, grp.struct_group]) -> List[Dict[str, Any]]:
         """Check sudo configuration"""
         findings = []
         
         try:
-            sudo_group = grp.getgrnam("sudo")
+            sudo_group = groups["sudo"]
             
             # Check sudo group members
             if len(sudo_group.gr_mem) > 0:
                 findings.append({
-                    "rule_id": "V-72047",
+                    **_SUDO_MEMBERS,
                     "title": "Direct Sudo Group Members",
-                    "status": "failed",
-                    "severity": "medium",
                     "description": f"Users are directly assigned to sudo group: {', '.join(sudo_group.gr_mem)}",
-                    "fix": "Remove users from sudo group and use sudoers file for access control",
-                    "check_type": "user_group"
+                    "fix": "Remove users from sudo group and use sudoers file for access control"
                 })
 
-            # Check sudoers file
-            if os.path.exists("/etc/sudoers"):
-                with open("/etc/sudoers", "r") as f:
-                    content = f.read()
-                    
-                    # Check for NOPASSWD entries
-                    if "NOPASSWD" in content:
-                        findings.append({
-                            "rule_id": "V-72049",
-                            "title": "Sudo Without Password",
-                            "status": "failed",
-                            "severity": "high",
-                            "description": "Sudo configuration allows execution without password",
-                            "fix": "Remove NOPASSWD entries from sudoers file",
-                            "check_type": "user_group"
-                        })
+            # Check sudoers file for NOPASSWD entries
+            loop = asyncio.get_running_loop()
+            if await loop.run_in_executor(None, self._sudoers_has_nopasswd):
+                findings.append({
+                    **_SUDO_NOPASSWD,
+                    "title": "Sudo Without Password",
+                    "description": "Sudo configuration allows execution without password",
+                    "fix": "Remove NOPASSWD entries from sudoers file"
+                })
 
         except Exception as e:
-            self.logger.error(f"Error checking sudo configuration: {str(e)}")
+            self.logger.error("Error checking sudo configuration: %s", e)
             findings.append({
-                "rule_id": "CHECK-ERROR",
+                **_CHECK_ERROR,
                 "title": "Sudo Configuration Check Error",
-                "status": "error",
-                "severity": "info",
                 "description": f"Error checking sudo configuration: {str(e)}",
-                "fix": "Ensure proper permissions to read sudo configuration",
-                "check_type": "user_group"
+                "fix": "Ensure proper permissions to read sudo configuration"
             })
 
-        return findings 
\ No newline at end of file
+        return findings 
+
+    def _sudoers_has_nopasswd(self, path: str = "/etc/sudoers") -> bool:
+        """Whether sudoers grants NOPASSWD, reusing the last answer while the file is unchanged"""
+        try:
+            return _cached_parse(path, _scan_sudoers_nopasswd)
+        except FileNotFoundError:
+            return False
\ No newline at end of file